@@ -1,8 +1,12 @@
+import os
+import json
+import importlib
+import tempfile
+import threading
 import click
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.styles import Style
-from bashbuddy.cli.commands import ask, process_ask_request, start, stop, reset, history
+# Load the (lightweight) cli subpackage up front: importing it later would
+# rebind bashbuddy.cli over the click group defined below
+import bashbuddy.cli
 from bashbuddy.daemon.manager import (
     start_daemon,
     stop_daemon,
@@ -13,33 +17,115 @@ from bashbuddy.daemon.client import (
     send_command,
     is_daemon_running
 )
+from bashbuddy.core.config import get_cache_dir
+
+
+def load_history_suggestions():
+    """
+    Get unique user queries from history for autocomplete.
+
+    The deduped list is cached in ~/.cache/bashbuddy/suggestions.json and
+    keyed by the daemon's history version, so the full history is only
+    fetched when it has changed since the last launch.
+    """
+    version_response = send_command("history_version")
+    if version_response.get("status") != "ok":
+        return []
+    version = [version_response.get("length"), version_response.get("mtime")]
+
+    try:
+        cache_file = get_cache_dir() / "suggestions.json"
+    except OSError:
+        # Cache directory can't be created (read-only home, ...): go without
+        cache_file = None
+
+    if cache_file is not None:
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+            if cached.get("version") == version:
+                return cached.get("suggestions", [])
+        except (OSError, ValueError):
+            pass
+
+    history_response = send_command("history")
+    if history_response.get("status") != "ok":
+        return []
+
+    # Extract unique, non-empty user queries from history (case-insensitive,
+    # first seen order); dict() does the dedupe in a single C-level pass
+    queries = list(filter(None, [
+        item["content"].strip()
+        for item in history_response.get("history", [])
+        if item["role"] == "user"
+    ]))
+    suggestions = list(dict(zip(map(str.lower, queries), queries)).values())
+
+    if cache_file is None:
+        return suggestions
+
+    # Write atomically so a concurrent launch never reads a partial file
+    # (through a temp file of our own, as concurrent launches write too)
+    try:
+        with tempfile.NamedTemporaryFile('w', dir=cache_file.parent, suffix=".tmp", delete=False) as f:
+            json.dump({"version": version, "suggestions": suggestions}, f)
+        try:
+            os.replace(f.name, cache_file)
+        except OSError:
+            os.unlink(f.name)
+            raise
+    except OSError:
+        pass
+
+    return suggestions
+
+
+class LazyGroup(click.Group):
+    """Click group that imports subcommands only when they are invoked.
+
+    Subcommands are given as {"name": "module.path:attribute"} so that
+    `bashbuddy ask` doesn't import the code (and dependencies) of every
+    other command at startup.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return super().list_commands(ctx) + sorted(self.lazy_subcommands)
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands:
+            module_name, attr = self.lazy_subcommands[cmd_name].split(":")
+            return getattr(importlib.import_module(module_name), attr)
+        return super().get_command(ctx, cmd_name)
 
 
 def interactive_mode():
     """Interactive mode - ask for input once, then process like 'ask' command."""
+    # Deferred so that plain subcommands don't pay for loading prompt_toolkit
+    from prompt_toolkit import prompt
+    from prompt_toolkit.completion import WordCompleter, DynamicCompleter
+    from prompt_toolkit.styles import Style
+    from bashbuddy.cli.commands import process_ask_request
+
     # Ensure daemon is running
     if not ensure_daemon_running():
         click.echo("Error: Failed to start BashBuddy daemon.", err=True)
         click.echo("Please check that GEMINI_API_KEY is set.", err=True)
         return
     
-    # Get history to use for autocomplete
-    history_response = send_command("history")
-    suggestions = []
-    
-    if history_response.get("status") == "ok":
-        history_items = history_response.get("history", [])
-        # Extract unique user queries from history
-        seen = set()
-        for item in history_items:
-            if item["role"] == "user":
-                query = item["content"].strip()
-                if query and query.lower() not in seen:
-                    suggestions.append(query)
-                    seen.add(query.lower())
-    
-    # Create completer with history suggestions
-    completer = WordCompleter(suggestions, ignore_case=True, match_middle=True)
+    # Load history suggestions in the background so the prompt shows up right
+    # away; DynamicCompleter picks up the real completer once it's ready
+    completers = [None]
+
+    def load_completer():
+        suggestions = load_history_suggestions()
+        completers[0] = WordCompleter(suggestions, ignore_case=True, match_middle=True)
+
+    threading.Thread(target=load_completer, daemon=True).start()
+    completer = DynamicCompleter(lambda: completers[0])
     
     # Custom style with better colors
     style = Style.from_dict({
@@ -68,7 +154,17 @@ def interactive_mode():
         return
 
 
-@click.group(invoke_without_command=True)
+@click.group(
+    cls=LazyGroup,
+    invoke_without_command=True,
+    lazy_subcommands={
+        "start": "bashbuddy.cli.commands:start",
+        "stop": "bashbuddy.cli.commands:stop",
+        "reset": "bashbuddy.cli.commands:reset",
+        "history": "bashbuddy.cli.commands:history",
+        "ask": "bashbuddy.cli.commands:ask",
+    },
+)
 @click.pass_context
 def cli(ctx):
     """BashBuddy - Your intelligent terminal command assistant."""
@@ -76,11 +172,3 @@ def cli(ctx):
     if ctx.invoked_subcommand is None:
         interactive_mode()
 
-
-# Register commands
-cli.add_command(start)
-cli.add_command(stop)
-cli.add_command(reset)
-cli.add_command(history)
-cli.add_command(ask)
-
@@ -1,31 +1,161 @@
 """User interaction and command execution functions."""
 
+import re
 import click
-import questionary
+import errno
+import shlex
+import shutil
 import subprocess
+from functools import lru_cache
 from typing import Optional
-from bashbuddy.core.config import load_environment
 from bashbuddy.core.supabase_logger import get_supabase_logger
+from bashbuddy.cli.formatting import style
+
+CLIPBOARD_COMMANDS = [
+    ['wl-copy'],
+    ['xclip', '-selection', 'clipboard'],
+    ['xsel', '--clipboard', '--input'],
+    ['pbcopy'],
+]
+
+
+@lru_cache(maxsize=1)
+def _find_clipboard_command() -> Optional[tuple[str, ...]]:
+    """
+    Return the first available clipboard command, with its executable
+    resolved to an absolute path, or None if no tool is installed.
+    The result is cached, so PATH is only searched once per process.
+
+    shutil.which walks PATH without spawning anything, and an absolute
+    executable path lets subprocess launch the tool with posix_spawn
+    instead of fork + exec.
+    """
+    for tool, *args in CLIPBOARD_COMMANDS:
+        path = shutil.which(tool)
+        if path:
+            return (path, *args)
+    return None
+
+
+class ClipboardSession:
+    """
+    Copies text with the clipboard tool found when the session is created,
+    so repeated copies only spawn the tool itself.
+    """
+
+    def __init__(self):
+        self.command = _find_clipboard_command()
+
+    def copy(self, text: str) -> bool:
+        """Copy text to the clipboard. Returns True if successful."""
+        if self.command is None:
+            return False
+        try:
+            subprocess.run(
+                self.command,
+                input=text.encode('utf-8'),
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            return True
+        except (subprocess.SubprocessError, FileNotFoundError):
+            return False
+
+
+# Global instance
+_clipboard_session: Optional[ClipboardSession] = None
+
+
+def get_clipboard_session() -> ClipboardSession:
+    """Get or create the global clipboard session (PATH is searched on first use)."""
+    global _clipboard_session
+    if _clipboard_session is None:
+        _clipboard_session = ClipboardSession()
+    return _clipboard_session
 
-load_environment()
 
 DANGEROUS_COMMANDS = ['rm', 'mv', 'dd', 'mkfs', 'shutdown', 'reboot', 'init', 'poweroff', 'halt', 'fdisk', 'parted', 'sudo']
 
+# Matches a command starting with one of DANGEROUS_COMMANDS as a whole word
+_DANGEROUS_RE = re.compile(r'(?:' + '|'.join(map(re.escape, DANGEROUS_COMMANDS)) + r')\b')
+
+
+def is_dangerous_command(command: str) -> bool:
+    """Check whether command starts with one of DANGEROUS_COMMANDS."""
+    return _DANGEROUS_RE.match(command.lstrip()) is not None
+
+
+# Anything the shell would interpret (pipes, redirects, expansions, quoting...)
+_SHELL_META_RE = re.compile(r"[|&;<>()$`\\\"'*?\[\]{}~#!\n]")
+
+# Shell builtins, which either don't exist as binaries or behave differently as one
+_SHELL_BUILTINS = frozenset([
+    'alias', 'bg', 'cd', 'command', 'echo', 'eval', 'exec', 'exit', 'export',
+    'fg', 'hash', 'history', 'jobs', 'printf', 'pwd', 'read', 'set', 'shift',
+    'source', 'test', 'times', 'trap', 'type', 'ulimit', 'umask', 'unalias',
+    'unset', 'wait'
+])
+
+
+def _direct_argv(command: str) -> Optional[tuple[str, list[str]]]:
+    """
+    Return (executable, argv) to run command without a shell, or None if
+    it needs one.
+
+    Plain 'program arg ...' commands are run directly so no /bin/sh is
+    spawned in between; anything using shell syntax or builtins isn't.
+    """
+    if _SHELL_META_RE.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in _SHELL_BUILTINS:
+        return None
+    # Also rejects variable assignments like FOO=1, which aren't on PATH
+    executable = shutil.which(argv[0])
+    if executable is None:
+        # Let the shell report "command not found" as usual
+        return None
+    return executable, argv
+
+
+@lru_cache(maxsize=1)
+def _command_logger():
+    """Supabase logger used for run/copy events (looked up once per process)."""
+    return get_supabase_logger()
+
+
+# Options offered by handle_command_action
+_ACTION_CHOICES = [
+    "[R] Run the command",
+    "[C] Copy to clipboard",
+    "[Q] Cancel"
+]
+
+
+@lru_cache(maxsize=1)
+def _action_menu_style():
+    """Style of the action menu (built once, on first use)."""
+    import questionary
+
+    return questionary.Style([
+        ('selected', 'fg:green bold'),
+        ('pointer', 'fg:yellow bold'),
+        ('question', 'fg:white bold')
+    ])
+
 
 def handle_command_action(command: str, explanation: str, user_request: str = "") -> None:
     """Handle user selection for command action (run/copy/quit)."""
+    import questionary
+
     action = questionary.select(
         "What would you like to do?",
-        choices=[
-            "Run the command",
-            "Copy to clipboard",
-            "Cancel"
-        ],
-        style=questionary.Style([
-            ('selected', 'fg:green bold'),
-            ('pointer', 'fg:yellow bold'),
-            ('question', 'fg:white bold')
-        ])
+        choices=_ACTION_CHOICES,
+        style=_action_menu_style()
     ).ask()
     
     if action == "[R] Run the command":
@@ -36,31 +166,53 @@ def handle_command_action(command: str, explanation: str, user_request: str = ""
         copy_to_clipboard(command, explanation, user_request)
 
 
+# Pre-built blocks of the prompt_user_action menu, each written with a single echo
+_ACTION_MENU_HEADER = "\n" + style("What would you like to do with this command?", fg="yellow", bold=True) + "\n"
+_ACTION_MENU_DANGEROUS = (
+    style("  [R]un the command. WARNING: This command could be potentially harmful!", fg="red", bold=True) + "\n"
+    + style("  Read the command carefully and only run if you are sure!", fg="red") + "\n"
+)
+_ACTION_MENU_RUN = style("  [R]un the command", fg="white") + "\n"
+_ACTION_MENU_FOOTER = (
+    style("  [C]opy to clipboard", fg="white") + "\n"
+    + style("  [Q]uit", fg="white") + "\n"
+    + style("  Or type a follow-up question", fg="cyan", dim=True) + "\n"
+)
+_ACTION_MENU_FOOTER_CACHED = (
+    style("  [C]opy to clipboard", fg="white") + "\n"
+    + style("  [F]orce fresh query", fg="yellow") + "\n"
+    + style("  [Q]uit", fg="white") + "\n"
+    + style("  Or type a follow-up question", fg="cyan", dim=True) + "\n"
+)
+
+_CHOICE_PROMPT = style("Your choice", fg="yellow")
+
+# Outcome messages of execute_command
+_COMMAND_OK_MESSAGE = style("\n[OK] Command completed successfully", fg="green", bold=True)
+_COMMAND_INTERRUPTED_MESSAGE = style("\n[!] Command interrupted by user", fg="yellow")
+
+# Shown by copy_to_clipboard when no clipboard tool could be used
+_NO_CLIPBOARD_MESSAGE = (
+    style("[ERROR] No clipboard tool found!", fg="red", bold=True) + "\n"
+    + style("  Install one of: wl-copy, xclip, xsel", fg="yellow") + "\n"
+    + "\n"
+    + style("  Here's the command to copy manually:", fg="white", bold=True)
+)
+
+
 def prompt_user_action(command: str, is_cached: bool = False) -> tuple[str, Optional[str]]:
     """
     Prompt user for what to do with the command.
     Returns tuple of (action, followup_text).
     """
-    click.echo()
-    click.echo(click.style("What would you like to do with this command?", fg="yellow", bold=True))
-
-    if any(command.strip().startswith(dc) for dc in DANGEROUS_COMMANDS):
-        click.echo(click.style("  [R]un the command. WARNING: This command could be potentially harmful!", fg="red", bold=True))
-        click.echo(click.style("  Read the command carefully and only run if you are sure!", fg="red"))
-    else:
-        click.echo(click.style("  [R]un the command", fg="white"))
-
-    click.echo(click.style("  [C]opy to clipboard", fg="white"))
-    
-    if is_cached:
-        click.echo(click.style("  [F]orce fresh query", fg="yellow"))
-    
-    click.echo(click.style("  [Q]uit", fg="white"))
-    click.echo(click.style("  Or type a follow-up question", fg="cyan", dim=True))
-    click.echo()
+    click.echo(
+        _ACTION_MENU_HEADER
+        + (_ACTION_MENU_DANGEROUS if is_dangerous_command(command) else _ACTION_MENU_RUN)
+        + (_ACTION_MENU_FOOTER_CACHED if is_cached else _ACTION_MENU_FOOTER)
+    )
     
     choice = click.prompt(
-        click.style("Your choice", fg="yellow"),
+        _CHOICE_PROMPT,
         default='q',
         show_default=False
     ).strip().lower()
@@ -81,70 +233,51 @@ def execute_command(command: str, explanation: str = "", user_request: str = "")
     """Execute bash command in subprocess and display output."""
     try:
         if explanation:
-            logger = get_supabase_logger()
-            logger.log_command(command, explanation, user_request)
+            _command_logger().log_command(command, explanation, user_request)
         
-        result = subprocess.run(
-            command,
-            shell=True,
-            text=True,
-            stdout=None,
-            stderr=None
-        )
+        # Output goes straight to the terminal, so there is nothing to decode
+        direct = _direct_argv(command)
+        result = None
+        if direct is not None:
+            executable, argv = direct
+            try:
+                result = subprocess.run(argv, executable=executable)
+            except OSError as e:
+                # An executable script without a shebang: only the shell runs those
+                if e.errno != errno.ENOEXEC:
+                    raise
+        if result is None:
+            result = subprocess.run(command, shell=True)
         
         click.echo()
         if result.returncode == 0:
-            click.echo(click.style("\n[OK] Command completed successfully", fg="green", bold=True))
+            click.echo(_COMMAND_OK_MESSAGE)
         else:
-            click.echo(click.style(f"[ERROR] Command exited with code {result.returncode}", fg="red", bold=True))
+            click.echo(style(f"[ERROR] Command exited with code {result.returncode}", fg="red", bold=True))
         
         return result.returncode == 0
         
     except KeyboardInterrupt:
         click.echo()
-        click.echo(click.style("\n[!] Command interrupted by user", fg="yellow"))
+        click.echo(_COMMAND_INTERRUPTED_MESSAGE)
         return False
     except Exception as e:
         click.echo()
-        click.echo(click.style(f"[ERROR] Error running command: {str(e)}", fg="red", bold=True))
+        click.echo(style(f"[ERROR] Error running command: {str(e)}", fg="red", bold=True))
         return False
 
 
 def copy_to_clipboard(command: str, explanation: str = "", user_request: str = "") -> bool:
     """Copy command to clipboard using available tools (wl-copy, xclip, xsel, pbcopy)."""
     if explanation:
-        logger = get_supabase_logger()
-        logger.log_command(command, explanation, user_request)
-    
-    clipboard_commands = [
-        ['wl-copy'],
-        ['xclip', '-selection', 'clipboard'],
-        ['xsel', '--clipboard', '--input'],
-        ['pbcopy'],
-    ]
+        _command_logger().log_command(command, explanation, user_request)
     
-    for clipboard_cmd in clipboard_commands:
-        try:
-            if subprocess.run(['which', clipboard_cmd[0]], 
-                            capture_output=True, 
-                            text=True).returncode == 0:
-                subprocess.run(
-                    clipboard_cmd,
-                    input=command,
-                    text=True,
-                    check=True,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL
-                )
-                click.echo(click.style(f"Command copied to clipboard!", fg="green", bold=True))
-                click.echo(click.style(f"  {command}", fg="cyan"))
-                return True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            continue
+    if get_clipboard_session().copy(command):
+        click.echo(
+            style("Command copied to clipboard!", fg="green", bold=True) + "\n"
+            + style(f"  {command}", fg="cyan")
+        )
+        return True
     
-    click.echo(click.style("[ERROR] No clipboard tool found!", fg="red", bold=True))
-    click.echo(click.style("  Install one of: wl-copy, xclip, xsel", fg="yellow"))
-    click.echo()
-    click.echo(click.style("  Here's the command to copy manually:", fg="white", bold=True))
-    click.echo(click.style(f"  {command}", fg="cyan", bold=True))
+    click.echo(_NO_CLIPBOARD_MESSAGE + "\n" + style(f"  {command}", fg="cyan", bold=True))
     return False
@@ -1,13 +1,16 @@
 """CLI command handlers."""
 
 import click
-import questionary
+from functools import lru_cache
+from bashbuddy.core.history import parse_command_entry
 from bashbuddy.daemon.client import send_command
 from bashbuddy.daemon.manager import ensure_daemon_running, start_daemon, stop_daemon
 from bashbuddy.cli.formatting import (
-    display_function_calls,
+    FunctionCallStream,
     display_command_and_explanation,
-    display_text_response
+    display_text_response,
+    rule,
+    style
 )
 from bashbuddy.cli.actions import (
     prompt_user_action,
@@ -17,75 +20,87 @@ from bashbuddy.cli.actions import (
 )
 
 
+# Static status lines of process_ask_request, styled once
+_CACHED_NOTICE = (
+    "\n"
+    + style("Retrieved result from history (exact match)", fg="cyan", dim=True) + "\n"
+    + style("  Press [F] to force a fresh query", fg="cyan", dim=True)
+)
+_FETCHING_FRESH_MESSAGE = style("\nFetching fresh result...\n", fg="yellow")
+_RUNNING_HEADER = (
+    style("\nRunning command...", fg="green", bold=True) + "\n"
+    + style("Command Output:", fg="white", bold=True)
+)
+
+
 def process_ask_request(message: str):
-    """Process an ask request and handle user interactions."""
+    """Process an ask request and handle user interactions.
+
+    Follow-up questions are handled in a loop rather than by recursing,
+    so a long interactive session doesn't grow the stack.
+    """
     # Automatically ensure daemon is running (starts it if needed)
     if not ensure_daemon_running():
         click.echo("Error: Failed to start BashBuddy daemon.", err=True)
         raise click.Abort()
     
-    # Send request to daemon
-    response = send_command("ask", message=message)
-    
-    if response.get("status") == "ok":
+    while True:
+        # Send request to daemon, showing function calls as they are made
+        response = send_command("ask", message=message, on_progress=FunctionCallStream())
+        
+        if response.get("status") != "ok":
+            click.echo(f"Error: {response.get('message', 'Unknown error')}", err=True)
+            raise click.Abort()
+        
         # Check if we got a structured command response
-        if "command" in response and "explanation" in response:
-            # Show function calls if any were made
-            display_function_calls(response.get("function_calls"))
-            
-            # Display command and explanation side by side
-            display_command_and_explanation(response)
-            
-            # Show if this is a cached result (AFTER displaying command)
-            if response.get("cached"):
-                click.echo()
-                click.echo(click.style("Retrieved result from history (exact match)", fg="cyan", dim=True))
-                click.echo(click.style("  Press [F] to force a fresh query", fg="cyan", dim=True))
-
-            # Prompt user for next action
-            action, followup = prompt_user_action(response["command"], is_cached=response.get("cached", False))
-
-            # Handle force refresh
-            if action == 'refresh':
-                click.echo(click.style("\nFetching fresh result...\n", fg="yellow"))
-                # Send request with force flag to bypass cache
-                response = send_command("ask", message=message, force_fresh=True)
-                if response.get("status") == "ok" and "command" in response:
-                    display_function_calls(response.get("function_calls"))
-                    display_command_and_explanation(response)
-                    action, followup = prompt_user_action(response["command"], is_cached=False)
-                else:
-                    click.echo("Error getting fresh result", err=True)
-                    return
-
-            if action == 'run':
-                click.echo(click.style("\nRunning command...", fg="green", bold=True))
-                click.echo(click.style("Command Output:", fg="white", bold=True))
-                execute_command(
-                    response["command"], 
-                    response.get("explanation", ""),
-                    message  # Pass the user's original request
-                )
-            elif action == 'copy':
-                click.echo()
-                copy_to_clipboard(
-                    response["command"], 
-                    response.get("explanation", ""),
-                    message  # Pass the user's original request
-                )
-            elif action == 'followup':
-                process_ask_request(followup)
-            # elif action == 'quit': just exit naturally
-
-        else:
-            # Regular text response - still show function calls if any
-            display_function_calls(response.get("function_calls"))
-            
-            # Display the text response
+        if "command" not in response or "explanation" not in response:
+            # Regular text response (function calls were already streamed)
             display_text_response(response["message"])
-    else:
-        click.echo(f"Error: {response.get('message', 'Unknown error')}", err=True)
-        raise click.Abort()
+            return
+        
+        # Display command and explanation side by side
+        display_command_and_explanation(response)
+        
+        # Show if this is a cached result (AFTER displaying command)
+        if response.get("cached"):
+            click.echo(_CACHED_NOTICE)
+
+        # Prompt user for next action
+        action, followup = prompt_user_action(response["command"], is_cached=response.get("cached", False))
+
+        # Handle force refresh
+        if action == 'refresh':
+            click.echo(_FETCHING_FRESH_MESSAGE)
+            # Send request with force flag to bypass cache
+            response = send_command(
+                "ask", message=message, force_fresh=True, on_progress=FunctionCallStream()
+            )
+            if response.get("status") == "ok" and "command" in response:
+                display_command_and_explanation(response)
+                action, followup = prompt_user_action(response["command"], is_cached=False)
+            else:
+                click.echo("Error getting fresh result", err=True)
+                return
+
+        if action == 'run':
+            click.echo(_RUNNING_HEADER)
+            execute_command(
+                response["command"], 
+                response.get("explanation", ""),
+                message  # Pass the user's original request
+            )
+        elif action == 'copy':
+            click.echo()
+            copy_to_clipboard(
+                response["command"], 
+                response.get("explanation", ""),
+                message  # Pass the user's original request
+            )
+        elif action == 'followup':
+            message = followup
+            continue
+        # elif action == 'quit': just exit naturally
+        return
 
 
 @click.command()
@@ -148,14 +163,65 @@ def reset():
         raise click.Abort()
 
 
+@lru_cache(maxsize=1)
+def _history_menu_style():
+    """Style of the history selection menu (built once, on first use)."""
+    import questionary
+
+    return questionary.Style([
+        ('selected', 'fg:cyan bold'),
+        ('pointer', 'fg:yellow bold'),
+        ('highlighted', 'fg:cyan'),
+        ('question', 'fg:white bold')
+    ])
+
+
+# Number of most recent questions and answers shown unless --all is given
+HISTORY_LIMIT = 25
+
+# Above this many commands, history uses a numbered prompt instead of the
+# arrow-key menu, which renders every entry on each keypress
+HISTORY_MENU_MAX = 20
+
+
+# Section labels of the history detail view
+_DETAIL_COMMAND_LABEL = style("  Command", fg="green", bold=True)
+_DETAIL_EXPLANATION_LABEL = style("  Explanation", fg="green", bold=True)
+
+
+def _select_by_number(commands: list, explanations: list):
+    """
+    Select a command from a numbered list typed at a plain prompt.
+    Returns the index of the selected command, or None if cancelled.
+    """
+    click.echo("\n".join(
+        f"{style(f'{number:>4}', fg='yellow')}  {style(cmd_line, fg='cyan')}\n      {exp}"
+        for number, ((cmd_line, _), exp) in enumerate(zip(commands, explanations), start=1)
+    ))
+    click.echo()
+    
+    number = click.prompt(
+        style("Select a command (0 to cancel)", fg="yellow"),
+        type=click.IntRange(0, len(commands)),
+        default=0,
+        show_default=False
+    )
+    return number - 1 if number else None
+
+
 @click.command()
-def history():
+@click.option("--all", "show_all", is_flag=True, help="Show the whole history instead of the most recent entries")
+def history(show_all):
     """Show the conversation history and select commands to run/copy."""
     if not ensure_daemon_running():
         click.echo("Error: Failed to start daemon", err=True)
         raise click.Abort()
         
-    result = send_command("history")
+    if show_all:
+        result = send_command("history")
+    else:
+        # (each turn is two messages: the question and its answer)
+        result = send_command("history", limit=2 * HISTORY_LIMIT)
     
     if result["status"] == "ok":
         history_items = result.get("history", [])
@@ -164,77 +230,77 @@ def history():
             click.echo("No conversation history yet.")
             return
         
-        # Extract only assistant responses that contain commands
+        # Extract only assistant responses that contain commands,
+        # as (command, explanation) tuples
         commands = []
         for item in history_items:
             if item["role"] == "assistant":
-                content = item["content"]
-                # Check if it's a command response (contains "Command:")
-                if "Command:" in content:
-                    # Extract command from "Command: <cmd>\nExplanation: <exp>"
-                    lines = content.split("\n")
-                    if lines:
-                        cmd_line = lines[0].replace("Command:", "").strip()
-                        explanation = ""
-                        if len(lines) > 1:
-                            explanation = lines[1].replace("Explanation:", "").strip()
-                        commands.append({"command": cmd_line, "explanation": explanation})
+                # Extract command from "Command: <cmd>\nExplanation: <exp>"
+                parsed = parse_command_entry(item["content"])
+                if parsed:
+                    commands.append(parsed)
         
         if not commands:
             click.echo("No commands in history yet.")
             return
         
-        # Create choices for questionary with command and description
-        choices = []
-        for cmd_data in commands:
-            cmd = cmd_data["command"]
-            exp = cmd_data["explanation"]
-            # Truncate explanation if too long
-            if len(exp) > 60:
-                exp = exp[:57] + "..."
-            # Format: command on first line, explanation indented below
-            choice = f"{cmd}\n      {exp}"
-            choices.append(choice)
+        # Format: command on first line, first line of the explanation
+        # (truncated if too long) indented below
+        explanations = [explanation.partition("\n")[0] for _, explanation in commands]
+        explanations = [exp if len(exp) <= 60 else exp[:57] + "..." for exp in explanations]
         
-        # Use questionary to select with arrow keys
         try:
-            click.echo(click.style("\nCommand History\n", fg="cyan", bold=True))
+            click.echo(style("\nCommand History\n", fg="cyan", bold=True))
+            if result.get("omitted"):
+                # e.g. "12 earlier messages, commands: ls -la; du -sh ..."
+                summary = result.get("summary") or f"{result['omitted']} earlier messages"
+                if len(summary) > 55:
+                    summary = summary[:52] + "..."
+                click.echo(style(f"  Not shown (use --all): {summary}\n", dim=True))
             
-            selected = questionary.select(
-                "Select a command:",
-                choices=choices,
-                style=questionary.Style([
-                    ('selected', 'fg:cyan bold'),
-                    ('pointer', 'fg:yellow bold'),
-                    ('highlighted', 'fg:cyan'),
-                    ('question', 'fg:white bold')
-                ])
-            ).ask()
+            if len(commands) > HISTORY_MENU_MAX:
+                selected = _select_by_number(commands, explanations)
+            else:
+                # questionary pulls in prompt_toolkit, so only import it here
+                import questionary
+
+                # Use questionary to select with arrow keys. Each choice's value
+                # is its index into commands, so the selection maps back directly.
+                choices = [
+                    questionary.Choice(f"{cmd_line}\n      {exp}", value=index)
+                    for index, ((cmd_line, _), exp) in enumerate(zip(commands, explanations))
+                ]
+                selected = questionary.select(
+                    "Select a command:",
+                    choices=choices,
+                    style=_history_menu_style()
+                ).ask()
             
-            if not selected:
+            if selected is None:
                 return
             
-            # Find the selected command data
-            selected_index = choices.index(selected)
-            cmd_data = commands[selected_index]
+            cmd_line, explanation = commands[selected]
             
-            # Show selected command details
-            click.echo()
-            click.echo(click.style("═" * 80, fg="green"))
-            click.echo(click.style(f"  Command", fg="green", bold=True))
-            click.echo(click.style("─" * 80, fg="white", dim=True))
-            click.echo(click.style(f"  {cmd_data['command']}", fg="cyan", bold=True))
-            click.echo()
-            click.echo(click.style(f"  Explanation", fg="green", bold=True))
-            click.echo(click.style("─" * 80, fg="white", dim=True))
-            click.echo(f"  {cmd_data['explanation']}")
-            click.echo(click.style("═" * 80, fg="green"))
-            click.echo()
+            # Show selected command details (written in one go)
+            click.echo("\n".join([
+                "",
+                rule("═", 80, fg="green"),
+                _DETAIL_COMMAND_LABEL,
+                rule("─", 80, fg="white", dim=True),
+                style(f"  {cmd_line}", fg="cyan", bold=True),
+                "",
+                _DETAIL_EXPLANATION_LABEL,
+                rule("─", 80, fg="white", dim=True),
+                f"  {explanation}",
+                rule("═", 80, fg="green"),
+                "",
+            ]))
             
             # Use shared function to handle action
-            handle_command_action(cmd_data['command'], cmd_data['explanation'], "")
+            handle_command_action(cmd_line, explanation, "")
             
-        except (KeyboardInterrupt, EOFError):
+        # (click.prompt turns Ctrl-C and EOF into click.Abort)
+        except (KeyboardInterrupt, EOFError, click.Abort):
             click.echo("\n")
             return
             
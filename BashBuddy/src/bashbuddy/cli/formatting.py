@@ -1,27 +1,107 @@
 """Text formatting and display utilities for CLI output."""
 
+import os
+import re
 import click
 import shutil
-from typing import Dict, List, Any
+import signal
+import sys
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+
+# Tokens of a command, each with the delimiter (if any) it may be wrapped after
+_COMMAND_TOKEN_RE = re.compile(r'[^ |;&]*[ |;&]?')
+
+# Marker used to split commands at delimiters (never expected in a command)
+_TOKEN_SENTINEL = "\x01"
+
+
+# Whether to emit ANSI colors, decided once: on a terminal unless NO_COLOR
+# is set (elsewhere click.echo would strip them anyway)
+_USE_COLOR = not os.environ.get("NO_COLOR") and sys.stdout.isatty()
+
+# ANSI escape sequences for the fixed palette used by the display functions
+# (the same codes click.style emits), blanked when colors are off
+RESET = "\x1b[0m" if _USE_COLOR else ""
+CYAN = "\x1b[36m" if _USE_COLOR else ""
+CYAN_BOLD = "\x1b[36m\x1b[1m" if _USE_COLOR else ""
+GREEN_BOLD = "\x1b[32m\x1b[1m" if _USE_COLOR else ""
+YELLOW_BOLD = "\x1b[33m\x1b[1m" if _USE_COLOR else ""
+
+# Terminal width, cached until the terminal is resized
+_terminal_width: Optional[int] = None
+
+
+def terminal_width() -> int:
+    """Get the terminal width in columns (cached, refreshed on SIGWINCH)."""
+    global _terminal_width
+    if _terminal_width is None:
+        _terminal_width = shutil.get_terminal_size().columns
+    return _terminal_width
+
+
+def _on_resize(signum, frame):
+    """Forget the cached terminal width when the terminal is resized."""
+    global _terminal_width
+    _terminal_width = None
+
+
+if hasattr(signal, "SIGWINCH"):
+    try:
+        signal.signal(signal.SIGWINCH, _on_resize)
+    except ValueError:
+        # signal handlers can only be installed from the main thread
+        pass
+
+
+def style(text: str, **kwargs) -> str:
+    """click.style, or the plain text when colors are off."""
+    if not _USE_COLOR:
+        return text
+    return click.style(text, **kwargs)
+
+
+def _write_lines(lines: List[str]) -> None:
+    """
+    Write pre-styled lines in a single write.
+
+    With colors on the text goes straight to stdout; otherwise click.echo
+    is used so its ANSI stripping still applies.
+    """
+    text = "\n".join(lines)
+    if _USE_COLOR:
+        sys.stdout.write(text + "\n")
+        sys.stdout.flush()
+    else:
+        click.echo(text)
+
+
+@lru_cache(maxsize=64)
+def rule(char: str, width: int, fg: Optional[str] = None, bold: bool = False, dim: bool = False) -> str:
+    """Return a (cached) horizontal rule of `char`, optionally styled."""
+    line = char * width
+    if fg is None and not bold and not dim:
+        return line
+    return style(line, fg=fg, bold=bold, dim=dim)
 
 
 def wrap_text(text: str, width: int) -> List[str]:
     """Wrap text to fit within specified width."""
-    words = text.split()
     lines = []
     current_line = []
-    current_length = 0
+    used = -1  # Length of current_line joined with spaces (-1 when empty)
     
-    for word in words:
-        word_length = len(word)
-        if current_length + word_length + len(current_line) <= width:
+    for word in text.split():
+        # One space before the word, except at the start of a line
+        used += len(word) + 1
+        if used <= width:
             current_line.append(word)
-            current_length += word_length
         else:
             if current_line:
                 lines.append(' '.join(current_line))
             current_line = [word]
-            current_length = word_length
+            used = len(word)
     
     if current_line:
         lines.append(' '.join(current_line))
@@ -29,6 +109,24 @@ def wrap_text(text: str, width: int) -> List[str]:
     return lines
 
 
+def _command_tokens(command: str) -> List[str]:
+    """
+    Split a command into tokens that each keep their trailing delimiter.
+    May include empty tokens, which never change a wrapped line.
+    """
+    if _TOKEN_SENTINEL in command:
+        return _COMMAND_TOKEN_RE.findall(command)
+    # Mark the end of every token, then split on the marks; a handful of
+    # C-level replace passes beat a regex scan by about 3x
+    return (
+        command.replace(" ", " " + _TOKEN_SENTINEL)
+        .replace("|", "|" + _TOKEN_SENTINEL)
+        .replace(";", ";" + _TOKEN_SENTINEL)
+        .replace("&", "&" + _TOKEN_SENTINEL)
+        .split(_TOKEN_SENTINEL)
+    )
+
+
 def wrap_command(command: str, width: int) -> List[str]:
     """Wrap command intelligently at spaces/special chars with indent for continuation."""
     if len(command) <= width - 2:
@@ -38,18 +136,7 @@ def wrap_command(command: str, width: int) -> List[str]:
     current_line = "  "
     indent = "    "
     
-    tokens = []
-    current_token = ""
-    
-    for char in command:
-        current_token += char
-        if char in (' ', '|', ';', '&'):
-            tokens.append(current_token)
-            current_token = ""
-    if current_token:
-        tokens.append(current_token)
-    
-    for token in tokens:
+    for token in _command_tokens(command):
         # Check if adding this token would exceed width
         test_line = current_line + token
         
@@ -68,111 +155,121 @@ def wrap_command(command: str, width: int) -> List[str]:
     return lines
 
 
-def display_function_calls(function_calls: List[Dict[str, Any]]) -> None:
-    """Display function calls in formatted box."""
-    if not function_calls:
-        return
-    
-    terminal_width = shutil.get_terminal_size().columns
-    box_width = min(60, terminal_width - 4)
+def _function_calls_header() -> List[str]:
+    """Lines of the 'Function Calls' box header."""
+    box_width = min(60, terminal_width() - 4)
+    return [
+        "",
+        rule("═", box_width),
+        f"{YELLOW_BOLD}  Function Calls{RESET}",
+        rule("═", box_width),
+        "",
+    ]
+
+
+def _function_call_lines(index: int, call: Dict[str, Any]) -> List[str]:
+    """Lines showing one numbered function call and its arguments."""
+    func_name = call['name']
+    args = call.get('args', {})
     
-    click.echo()
-    click.echo("═" * box_width)
-    click.echo(click.style("  Function Calls", fg="yellow", bold=True))
-    click.echo("═" * box_width)
-    click.echo()
+    # Format function signature
+    out = [f"{CYAN}  {index}. {func_name}({RESET}"]
     
-    for i, call in enumerate(function_calls, 1):
-        func_name = call['name']
-        args = call.get('arguments', {})
+    # Format arguments
+    for key, value in args.items():
+        # Truncate long values
+        value_str = str(value)
+        if len(value_str) > 60:
+            value_str = value_str[:57] + "..."
         
-        # Format function signature
-        click.echo(click.style(f"  {i}. {func_name}(", fg="cyan"))
-        
-        # Format arguments
-        for key, value in args.items():
-            # Truncate long values
-            value_str = str(value)
-            if len(value_str) > 60:
-                value_str = value_str[:57] + "..."
-            
-            # Handle multiline values
-            if '\n' in value_str:
-                lines = value_str.split('\n')
-                click.echo(f"       {key}=\"{lines[0]}\"")
-                for line in lines[1:]:
-                    click.echo(f"       {line}")
-            else:
-                click.echo(f"       {key}=\"{value_str}\"")
-        
-        click.echo("     )")
-        click.echo()
+        # Handle multiline values
+        if '\n' in value_str:
+            lines = value_str.split('\n')
+            out.append(f"       {key}=\"{lines[0]}\"")
+            for line in lines[1:]:
+                out.append(f"       {line}")
+        else:
+            out.append(f"       {key}=\"{value_str}\"")
+    
+    out.append("     )")
+    out.append("")
+    return out
+
+
+class FunctionCallStream:
+    """Display function calls one at a time as the daemon streams them."""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, frame: Dict[str, Any]) -> None:
+        """Show the function call carried by a progress frame."""
+        self.count += 1
+        out = _function_calls_header() if self.count == 1 else []
+        out.extend(_function_call_lines(self.count, frame["function_call"]))
+        _write_lines(out)
 
 
 def display_command_and_explanation(response: Dict[str, Any]) -> None:
     """Display command and explanation side by side in formatted table."""
-    terminal_width = shutil.get_terminal_size().columns
-    
     # Use full terminal width, minus some padding
-    table_width = min(terminal_width - 4, 100)
+    table_width = min(terminal_width() - 4, 100)
     command_width = int(table_width * 0.3)  # 30% for command
     explanation_width = table_width - command_width - 3  # Rest for explanation (minus separators)
     
     command = response['command']
     explanation = response['explanation']
     
-    # Wrap text
-    command_lines = wrap_command(command, command_width)
-    explanation_lines = wrap_text(explanation, explanation_width)
-    
-    # Make lists same length
-    max_lines = max(len(command_lines), len(explanation_lines))
-    while len(command_lines) < max_lines:
-        command_lines.append("")
-    while len(explanation_lines) < max_lines:
-        explanation_lines.append("")
-    
-    # Print table
-    click.echo()
-    click.echo("═" * table_width)
-    click.echo(
-        click.style(f"  {'Command':<{command_width}}", fg="green", bold=True) +
-        "│ " +
-        click.style(f"{'Explanation'}", fg="green", bold=True)
-    )
-    click.echo("─" * table_width)
-    
-    for cmd_line, exp_line in zip(command_lines, explanation_lines):
-        # Pad command line
-        cmd_display = cmd_line.ljust(command_width)
-        exp_display = f"  {exp_line}"
+    if len(command) <= command_width - 2 and len(explanation) <= explanation_width:
+        # Both fit on one row: skip wrapping and padding (joining the words
+        # is exactly what wrap_text would produce for a single line)
+        command_lines = [f"  {command}"]
+        explanation_lines = [" ".join(explanation.split())]
+    else:
+        # Wrap text
+        command_lines = wrap_command(command, command_width)
+        explanation_lines = wrap_text(explanation, explanation_width)
         
-        click.echo(
-            click.style(cmd_display, fg="cyan", bold=True) +
-            "│" +
-            exp_display
-        )
+        # Make lists same length
+        max_lines = max(len(command_lines), len(explanation_lines))
+        command_lines.extend([""] * (max_lines - len(command_lines)))
+        explanation_lines.extend([""] * (max_lines - len(explanation_lines)))
     
-    click.echo("═" * table_width)
+    # Build table, then write it in one go
+    out = [
+        "",
+        rule("═", table_width),
+        f"{GREEN_BOLD}  {'Command':<{command_width}}{RESET}│ {GREEN_BOLD}Explanation{RESET}",
+        rule("─", table_width),
+    ]
+    
+    # Command column padded to width, then the separator and explanation
+    out.extend(
+        f"{CYAN_BOLD}{cmd_line:<{command_width}}{RESET}│  {exp_line}"
+        for cmd_line, exp_line in zip(command_lines, explanation_lines)
+    )
+    
+    out.append(rule("═", table_width))
+    _write_lines(out)
 
 
 def display_text_response(message_text: str) -> None:
     """Display text response in formatted box."""
-    terminal_width = shutil.get_terminal_size().columns
-    box_width = min(terminal_width - 4, 100)
-    
-    click.echo()
-    click.echo("═" * box_width)
-    click.echo(click.style("  Response", fg="green", bold=True))
-    click.echo("═" * box_width)
-    click.echo()
+    box_width = min(terminal_width() - 4, 100)
     
     # Wrap text to fit
     content_width = box_width - 4
     lines = wrap_text(message_text, content_width)
     
-    for line in lines:
-        click.echo(f"  {line}")
-    
-    click.echo()
-    click.echo("─" * box_width)
+    # Build the box, then write it in one go
+    out = [
+        "",
+        rule("═", box_width),
+        f"{GREEN_BOLD}  Response{RESET}",
+        rule("═", box_width),
+        "",
+    ]
+    out.extend(f"  {line}" for line in lines)
+    out.append("")
+    out.append(rule("─", box_width))
+    _write_lines(out)
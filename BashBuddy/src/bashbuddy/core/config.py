@@ -1,29 +1,138 @@
 """Configuration and environment setup."""
 
 import os
+import re
 import sys
+import queue
+import atexit
 import logging
+import logging.handlers
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Final
 
 
+_HOME_ENV = Path.home() / ".bashbuddy" / ".env"  # ~/.bashbuddy/.env
+_PROJECT_ENV = Path(__file__).parents[3] / ".env"  # Project root
+
+
+def _env_locations():
+    """Places a .env file is looked for, in order of preference."""
+    # Only the working directory can change while we run
+    return (Path.cwd() / ".env", _HOME_ENV, _PROJECT_ENV)
+
+
+# Quoted values, which may span several lines
+_DOUBLE_QUOTED_RE = re.compile(r'"((?:\\.|[^"\\])*)"', re.DOTALL)
+_SINGLE_QUOTED_RE = re.compile(r"'((?:\\'|[^'])*)'", re.DOTALL)
+
+# Backslash escapes understood in double quoted values (as python-dotenv)
+_ESCAPE_RE = re.compile(r"""\\([\\'"abfnrtv])""")
+_ESCAPES = {
+    "\\": "\\", "'": "'", '"': '"', "a": "\a", "b": "\b",
+    "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v",
+}
+
+# ${VAR} or ${VAR:-default}
+_VARIABLE_RE = re.compile(r"\$\{([^}:]+)(?::-([^}]*))?\}")
+
+
+def parse_env(text: str) -> dict[str, str]:
+    """
+    Parse the contents of a .env file into a dict, the way python-dotenv does.
+
+    Supports KEY=value lines, an optional 'export ' prefix, comments
+    (whole-line, or after an unquoted value) and single or double quoted
+    values, which may span lines. Double quoted values understand
+    backslash escapes such as \\n. ${VAR} and ${VAR:-default} are expanded,
+    from the environment first and then from the variables defined above.
+    """
+    env = {}
+
+    def expand(value: str) -> str:
+        return _VARIABLE_RE.sub(
+            lambda m: os.environ.get(m.group(1)) or env.get(m.group(1)) or m.group(2) or "",
+            value
+        )
+
+    pos = 0
+    while pos < len(text):
+        line_end = text.find("\n", pos)
+        if line_end == -1:
+            line_end = len(text)
+        line = text[pos:line_end]
+        next_line = line_end + 1
+
+        key, sep, value = line.partition("=")
+        key = key.strip()
+        if key.startswith("export "):
+            key = key[7:].strip()
+        if not sep or not key or key.startswith("#"):
+            pos = next_line
+            continue
+
+        value_start = pos + len(line) - len(value.lstrip())
+        quoted = _DOUBLE_QUOTED_RE.match(text, value_start) or _SINGLE_QUOTED_RE.match(text, value_start)
+        if quoted:
+            value = quoted.group(1)
+            if text[value_start] == '"':
+                value = _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group(1)], value)
+            else:
+                value = value.replace("\\'", "'")
+            value = expand(value)
+            # Skip anything after the closing quote (a comment)
+            after = text.find("\n", quoted.end())
+            next_line = len(text) if after == -1 else after + 1
+        elif value.strip()[:1] in ('"', "'"):
+            # Unterminated quote: the rest of the line
+            value = value.strip()[1:]
+        else:
+            value = expand(value.partition(" #")[0].strip())
+
+        env[key] = value
+        pos = next_line
+    return env
+
+
+@lru_cache(maxsize=1)
 def load_environment():
-    """Load environment variables from .env file."""
-    env_locations = [
-        Path.cwd() / ".env",  # Current working directory
-        Path.home() / ".bashbuddy" / ".env",  # ~/.bashbuddy/.env
-        Path(__file__).parent.parent.parent.parent / ".env",  # Project root
-    ]
+    """
+    Load environment variables from the first .env file found.
+    Returns the path that was loaded, or None if there was none.
+    Only the first call reads the file.
+    """
+    for env_path in _env_locations():
+        try:
+            text = env_path.read_text()
+        except OSError:
+            continue
+        # Variables already set in the environment take precedence
+        for key, value in parse_env(text).items():
+            os.environ.setdefault(key, value)
+        return env_path
     
-    for env_path in env_locations:
-        if env_path.exists():
-            load_dotenv(env_path)
-            return True
-    
-    return False
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_runtime_dir():
+    """Get the directory for the socket, PID file and logs (~/.bashbuddy), created once."""
+    runtime_dir = Path.home() / ".bashbuddy"
+    runtime_dir.mkdir(exist_ok=True)
+    return runtime_dir
+
 
+@lru_cache(maxsize=1)
+def get_cache_dir():
+    """Get the directory for client-side caches (~/.cache/bashbuddy), created once."""
+    cache_dir = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "bashbuddy"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
 
-SYSTEM_INSTRUCTION = (
+
+GEMINI_MODEL: Final = "gemini-2.0-flash"
+
+SYSTEM_INSTRUCTION: Final = (
     "You are BashBuddy, a bash command assistant. YOUR ONLY JOB is to provide bash commands.\n\n"
     
     "CRITICAL RULES - FOLLOW THESE EXACTLY:\n"
@@ -79,42 +188,69 @@ SYSTEM_INSTRUCTION = (
 )
 
 
+# Log records buffered in memory before they are written to the log file
+LOG_BUFFER_CAPACITY = 512
+
+# Background thread writing queued log records (see setup_logging)
+_log_listener = None
+
+
 def setup_logging():
-    """Configure logging to file."""
-    log_dir = Path.home() / ".bashbuddy"
-    log_dir.mkdir(exist_ok=True)
-    log_file = log_dir / "daemon.log"
-    
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s [%(levelname)s] %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()  # Also print to stdout when run manually
-        ]
+    """
+    Configure logging to file.
+
+    Loggers only put records on a queue; a listener thread formats them
+    and writes them out, so slow storage never blocks request handling.
+    File output is also buffered: records are written in batches of
+    LOG_BUFFER_CAPACITY, immediately on ERROR, and at exit. Even ERROR
+    records may therefore reach the file a few milliseconds late.
+    """
+    global _log_listener
+    log_file = get_runtime_dir() / "daemon.log"
+    
+    file_buffer = logging.handlers.MemoryHandler(
+        capacity=LOG_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=logging.FileHandler(log_file),
+        flushOnClose=True
     )
+    stream_handler = logging.StreamHandler()  # Also print to stdout when run manually
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+    file_buffer.target.setFormatter(formatter)
+    stream_handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, file_buffer, stream_handler)
+    _log_listener.start()
+    atexit.register(flush_logging)
+    
+    # Only merge the message arguments here; the rest is formatted by the listener
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    logging.basicConfig(level=logging.DEBUG, handlers=[queue_handler])
     return logging.getLogger(__name__)
 
 
+def flush_logging():
+    """Stop the log listener and write out every queued or buffered record."""
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.flush()
+    _log_listener = None
+
+
 def load_api_key(logger):
     """Load API key from environment."""
     # Load .env from multiple possible locations
     # Try current directory first, then home directory
-    env_locations = [
-        Path.cwd() / ".env",  # Current working directory
-        Path.home() / ".bashbuddy" / ".env",  # ~/.bashbuddy/.env
-        Path(__file__).parent.parent.parent.parent / ".env",  # Project root
-    ]
-    
-    env_loaded = False
-    for env_path in env_locations:
-        if env_path.exists():
-            load_dotenv(env_path)
-            logger.info(f"Loaded .env from: {env_path}")
-            env_loaded = True
-            break
-    
-    if not env_loaded:
+    env_path = load_environment()
+    if env_path:
+        logger.info(f"Loaded .env from: {env_path}")
+    else:
         logger.warning("No .env file found in standard locations")
     
     # Get API key
@@ -132,7 +268,7 @@ def load_api_key(logger):
         logger.error("  3. Add your key:")
         logger.error("       echo 'GEMINI_API_KEY=your_key_here' > ~/.bashbuddy/.env")
         logger.error("")
-        logger.error(f"Searched locations: {[str(p) for p in env_locations]}")
+        logger.error(f"Searched locations: {[str(p) for p in _env_locations()]}")
         logger.error("=" * 70)
         sys.exit(1)
     
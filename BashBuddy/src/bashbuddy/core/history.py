@@ -0,0 +1,25 @@
+"""Helpers for the conversation history entries kept by the daemon."""
+
+from typing import Optional
+
+# Assistant replies that suggest a command are stored as
+# "Command: <command>\nExplanation: <explanation>"
+_COMMAND_PREFIX = "Command:"
+_EXPLANATION_PREFIX = "Explanation:"
+
+
+def parse_command_entry(content: str) -> Optional[tuple[str, str]]:
+    """
+    Parse a stored command reply into (command, explanation).
+    Returns None if the content is not a command reply.
+    """
+    if not content.startswith(_COMMAND_PREFIX):
+        return None
+
+    command, _, rest = content[len(_COMMAND_PREFIX):].partition("\n")
+    rest = rest.lstrip("\n")
+    if rest.startswith(_EXPLANATION_PREFIX):
+        explanation = rest[len(_EXPLANATION_PREFIX):]
+    else:
+        explanation = ""
+    return command.strip(), explanation.strip()
@@ -1,18 +1,132 @@
 """Supabase logging for command history."""
 
 import os
+import time
+import queue
+import atexit
 import logging
-from typing import Optional
-from supabase import create_client, Client
+import threading
+from typing import Optional, TYPE_CHECKING
+from bashbuddy.core.config import load_environment
+
+if TYPE_CHECKING:
+    import httpx
 
 logger = logging.getLogger(__name__)
 
+# Rows waiting to be sent beyond this are dropped rather than blocking
+MAX_QUEUED_ROWS = 1024
+# Rows arriving within this many seconds of each other are sent in one insert
+FLUSH_INTERVAL = 1.0
+MAX_BATCH_SIZE = 100
+# Seconds to wait for Supabase before giving up on an insert
+REQUEST_TIMEOUT = 5.0
+
+# Fields shared by every logged row
+_ROW_TEMPLATE = {"user": "a25c7126-1d92-4902-a217-2a32cc807550"}
+
+# Category mappings for common commands (built once at import)
+CATEGORIES = {
+    # File operations
+    "ls": "file_operations",
+    "cd": "file_operations",
+    "pwd": "file_operations",
+    "mkdir": "file_operations",
+    "rmdir": "file_operations",
+    "rm": "file_operations",
+    "cp": "file_operations",
+    "mv": "file_operations",
+    "touch": "file_operations",
+    "cat": "file_operations",
+    "less": "file_operations",
+    "more": "file_operations",
+    "head": "file_operations",
+    "tail": "file_operations",
+    
+    # Search and filter
+    "find": "search",
+    "grep": "search",
+    "locate": "search",
+    "which": "search",
+    "whereis": "search",
+    
+    # Text processing
+    "sed": "text_processing",
+    "awk": "text_processing",
+    "cut": "text_processing",
+    "sort": "text_processing",
+    "uniq": "text_processing",
+    "wc": "text_processing",
+    "tr": "text_processing",
+    
+    # System info
+    "ps": "system_info",
+    "top": "system_info",
+    "htop": "system_info",
+    "df": "system_info",
+    "du": "system_info",
+    "free": "system_info",
+    "uname": "system_info",
+    "uptime": "system_info",
+    
+    # Network
+    "ping": "network",
+    "curl": "network",
+    "wget": "network",
+    "ssh": "network",
+    "scp": "network",
+    "netstat": "network",
+    "ifconfig": "network",
+    "ip": "network",
+    
+    # Permissions
+    "chmod": "permissions",
+    "chown": "permissions",
+    "chgrp": "permissions",
+    
+    # Archives
+    "tar": "archives",
+    "zip": "archives",
+    "unzip": "archives",
+    "gzip": "archives",
+    "gunzip": "archives",
+    
+    # Package management
+    "apt": "package_management",
+    "apt-get": "package_management",
+    "dnf": "package_management",
+    "yum": "package_management",
+    "pacman": "package_management",
+    "brew": "package_management",
+    
+    # Version control
+    "git": "git",
+    "svn": "version_control",
+    
+    # Docker
+    "docker": "docker",
+    "docker-compose": "docker",
+    
+    # Other
+    "sudo": "privileges",
+    "su": "privileges",
+}
+
 
 class SupabaseLogger:
-    """Log commands to Supabase database."""
+    """
+    Log commands to Supabase database.
+    
+    Rows are posted straight to the project's REST (PostgREST) endpoint
+    over one long-lived HTTP client, so the connection is kept alive
+    between inserts.
+    """
     
     def __init__(self):
-        self.client: Optional[Client] = None
+        self.client: Optional["httpx.Client"] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=MAX_QUEUED_ROWS)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
         self._initialize()
     
     def _initialize(self):
@@ -20,12 +134,30 @@ class SupabaseLogger:
         url = os.getenv("SUPABASE_URL")
         key = os.getenv("SUPABASE_KEY")
         
+        # Only read .env when the credentials aren't already in the environment,
+        # and only once the logger is actually needed
+        if not url or not key:
+            load_environment()
+            url = os.getenv("SUPABASE_URL")
+            key = os.getenv("SUPABASE_KEY")
+        
         if not url or not key:
             logger.info("Supabase not configured - command logging disabled (optional feature)")
             return
         
         try:
-            self.client = create_client(url, key)
+            # Imported here, it only pays off once logging is actually configured
+            import httpx
+            
+            self.client = httpx.Client(
+                base_url=f"{url.rstrip('/')}/rest/v1",
+                headers={
+                    "apikey": key,
+                    "Authorization": f"Bearer {key}",
+                    "Prefer": "return=minimal",
+                },
+                timeout=REQUEST_TIMEOUT,
+            )
             logger.info("Supabase client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Supabase client: {e}")
@@ -40,138 +172,97 @@ class SupabaseLogger:
         if not command or not command.strip():
             return "unknown"
         
-        # Get first word (command name)
-        first_word = command.strip().split()[0]
-        
-        # Define category mappings for common commands
-        categories = {
-            # File operations
-            "ls": "file_operations",
-            "cd": "file_operations",
-            "pwd": "file_operations",
-            "mkdir": "file_operations",
-            "rmdir": "file_operations",
-            "rm": "file_operations",
-            "cp": "file_operations",
-            "mv": "file_operations",
-            "touch": "file_operations",
-            "cat": "file_operations",
-            "less": "file_operations",
-            "more": "file_operations",
-            "head": "file_operations",
-            "tail": "file_operations",
-            
-            # Search and filter
-            "find": "search",
-            "grep": "search",
-            "locate": "search",
-            "which": "search",
-            "whereis": "search",
-            
-            # Text processing
-            "sed": "text_processing",
-            "awk": "text_processing",
-            "cut": "text_processing",
-            "sort": "text_processing",
-            "uniq": "text_processing",
-            "wc": "text_processing",
-            "tr": "text_processing",
-            
-            # System info
-            "ps": "system_info",
-            "top": "system_info",
-            "htop": "system_info",
-            "df": "system_info",
-            "du": "system_info",
-            "free": "system_info",
-            "uname": "system_info",
-            "uptime": "system_info",
-            
-            # Network
-            "ping": "network",
-            "curl": "network",
-            "wget": "network",
-            "ssh": "network",
-            "scp": "network",
-            "netstat": "network",
-            "ifconfig": "network",
-            "ip": "network",
-            
-            # Permissions
-            "chmod": "permissions",
-            "chown": "permissions",
-            "chgrp": "permissions",
-            
-            # Archives
-            "tar": "archives",
-            "zip": "archives",
-            "unzip": "archives",
-            "gzip": "archives",
-            "gunzip": "archives",
-            
-            # Package management
-            "apt": "package_management",
-            "apt-get": "package_management",
-            "dnf": "package_management",
-            "yum": "package_management",
-            "pacman": "package_management",
-            "brew": "package_management",
-            
-            # Version control
-            "git": "git",
-            "svn": "version_control",
-            
-            # Docker
-            "docker": "docker",
-            "docker-compose": "docker",
-            
-            # Other
-            "sudo": "privileges",
-            "su": "privileges",
-        }
+        # Get first word (command name), splitting only once
+        first_word = command.split(None, 1)[0]
         
         # Return mapped category or use first word
-        return categories.get(first_word, first_word)
+        return CATEGORIES.get(first_word, first_word)
     
     def log_command(self, command: str, explanation: str, user_request: str) -> bool:
         """
-        Log a command to Supabase.
+        Queue a command to be logged to Supabase.
         
         Paramaters:
             command: The bash command
             explanation: Gemini's explanation
             user_request: The user's original question/request
         
-        Returns True if successful, False otherwise.
+        Rows are inserted by a background thread, so this never waits on
+        the network. Returns True if the row was queued, False otherwise.
         """
         if not self.client:
             logger.debug("Supabase not configured - skipping command log")
             return False
         
+        data = _ROW_TEMPLATE | {
+            "query": user_request,
+            "suggested_command": command,
+            "cmd": self.determine_category(command),
+            "response": explanation
+        }
+        
         try:
-            category = self.determine_category(command)
-            
-            # Build data with only non-empty fields - don't include user
-            data = {
-                "user": "a25c7126-1d92-4902-a217-2a32cc807550",
-                "query": user_request,
-                "suggested_command": command,
-                "cmd": category,
-                "response": explanation
-            }
+            self._queue.put_nowait(data)
+        except queue.Full:
+            logger.warning("Supabase log queue full - dropping command log: %s", command[:50])
+            return False
+        
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._drain, name="bb-supabase-log", daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+        return True
+    
+    def _drain(self):
+        """Insert queued rows in batches, collecting rows that arrive close together."""
+        while True:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            # A None in the queue is a flush request: send what we have right away
+            while item is not None:
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= MAX_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            else:
+                self._queue.task_done()
             
-            logger.info(f"Attempting to insert into requests table: {data}")
+            if batch:
+                self._insert(batch)
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def _insert(self, rows: list) -> None:
+        """Insert rows into the requests table."""
+        try:
+            # Arguments are only formatted if INFO is enabled (the CLI doesn't configure logging)
+            logger.info("Attempting to insert %d row(s) into requests table", len(rows))
             
-            # Insert into the requests table
-            response = self.client.table("requests").insert(data).execute()
+            # Insert into the requests table (PostgREST takes a list for bulk inserts)
+            response = self.client.post("/requests", json=rows)
+            response.raise_for_status()
             
-            logger.info(f"Supabase insert response: {response}")
-            logger.info(f"✓ Logged command to Supabase: {command[:50]}... (category: {category})")
-            return True
+            logger.info("Supabase insert response: %s", response.status_code)
+            if logger.isEnabledFor(logging.INFO):
+                for row in rows:
+                    logger.info("✓ Logged command to Supabase: %s... (category: %s)",
+                                row["suggested_command"][:50], row["cmd"])
             
         except Exception as e:
             logger.error(f"Failed to log command to Supabase: {e}")
-            return False
+    
+    def flush(self) -> None:
+        """Wait until every queued row has been sent (called at exit)."""
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._queue.join()
 
 
 # Global instance
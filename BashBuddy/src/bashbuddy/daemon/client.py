@@ -1,23 +1,32 @@
 """Client functions for communicating with the BashBuddy daemon."""
 
 import os
-import json
 import socket
-from pathlib import Path
+import threading
+
+from bashbuddy.core.config import get_runtime_dir
+from bashbuddy.daemon.protocol import encode_frame, read_frame
+
+
+# Connection to the daemon, reused across send_command calls in this process
+_conn_lock = threading.Lock()
+_conn: socket.socket | None = None
+
+# Pre-encoded request frames for the commands that take no arguments
+_STATIC_REQUESTS = {
+    name: encode_frame({"command": name})
+    for name in ("ping", "status", "reset", "history", "history_version")
+}
 
 
 def get_socket_path():
     """Get the path to the Unix socket."""
-    runtime_dir = Path.home() / ".bashbuddy"
-    runtime_dir.mkdir(exist_ok=True)
-    return str(runtime_dir / "daemon.sock")
+    return str(get_runtime_dir() / "daemon.sock")
 
 
 def get_pid_file():
     """Get the path to the PID file."""
-    runtime_dir = Path.home() / ".bashbuddy"
-    runtime_dir.mkdir(exist_ok=True)
-    return str(runtime_dir / "daemon.pid")
+    return str(get_runtime_dir() / "daemon.pid")
 
 
 def is_daemon_running():
@@ -41,50 +50,107 @@ def is_daemon_running():
         return False
 
 
-def send_command(command: str, **kwargs):
-    """Send a command to the daemon and return the response."""
+def _get_connection(socket_path: str):
+    """Return the pooled daemon connection, connecting lazily."""
+    global _conn
+    if _conn is None:
+        client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client_socket.settimeout(60)  # 60 second timeout (increased for API rate limits)
+        try:
+            client_socket.connect(socket_path)
+        except OSError:
+            client_socket.close()
+            raise
+        _conn = client_socket
+    return _conn
+
+
+def _close_connection():
+    """Close and forget the pooled daemon connection."""
+    global _conn
+    if _conn is not None:
+        try:
+            _conn.close()
+        except OSError:
+            pass
+        _conn = None
+
+
+def _exchange(socket_path: str, request_data: bytes, on_progress=None):
+    """
+    Send one request frame and read frames until the final response.
+    Returns the parsed response, or None if the daemon closed the connection.
+    """
+    conn = _get_connection(socket_path)
+    conn.sendall(request_data)
+
+    while True:
+        frame = read_frame(conn)
+        if frame is None:
+            # Daemon closed the connection, don't reuse it
+            _close_connection()
+            return None
+        if frame.get("status") == "progress":
+            if on_progress is not None:
+                on_progress(frame)
+            continue
+        return frame
+
+
+def send_command(command: str, on_progress=None, **kwargs):
+    """
+    Send a command to the daemon and return the response.
+
+    If on_progress is given the daemon is asked to stream, and on_progress
+    is called with each progress frame received before the final response.
+    """
     socket_path = get_socket_path()
     
     if not os.path.exists(socket_path):
         return {"status": "error", "message": "Daemon not running. Start it with: bashbuddy start"}
-        
-    try:
-        # Create socket and connect
-        client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        client_socket.settimeout(60)  # 60 second timeout (increased for API rate limits)
-        client_socket.connect(socket_path)
-        
-        # Prepare request
+    
+    # Prepare request (one length-prefixed frame)
+    if not kwargs and on_progress is None and command in _STATIC_REQUESTS:
+        request_data = _STATIC_REQUESTS[command]
+    else:
         request = {"command": command, **kwargs}
-        request_data = json.dumps(request).encode('utf-8') + b"\n\n"
-        
-        # Send request
-        client_socket.sendall(request_data)
+        if on_progress is not None:
+            request["stream"] = True
+        request_data = encode_frame(request)
         
-        # Receive response
-        data = b""
-        while True:
-            chunk = client_socket.recv(4096)
-            if not chunk:
-                break
-            data += chunk
-            if b"\n\n" in data:
-                break
-                
-        client_socket.close()
-        
-        # Parse response
-        if not data:
-            return {"status": "error", "message": "Daemon closed connection (possibly crashed). Try: bb stop && bb start"}
-        
-        response = json.loads(data.decode('utf-8').strip())
-        return response
-        
-    except socket.timeout:
-        return {"status": "error", "message": "Request timed out (API may be slow or rate limited)"}
-    except ConnectionRefusedError:
-        return {"status": "error", "message": "Could not connect to daemon"}
-    except BrokenPipeError:
-        return {"status": "error", "message": "Connection broken (daemon may have crashed). Try restarting: bb stop && bb start"}
-    except Exception as e:
-        return {"status": "error", "message": f"Communication error: {str(e)}"}
+    with _conn_lock:
+        try:
+            reused = _conn is not None
+            try:
+                response = _exchange(socket_path, request_data, on_progress)
+            except (BrokenPipeError, ConnectionResetError):
+                if not reused:
+                    raise
+                response = None
+            
+            if response is None and reused:
+                # Pooled connection went stale (e.g. daemon restarted), reconnect once
+                _close_connection()
+                response = _exchange(socket_path, request_data, on_progress)
+            
+            if response is None:
+                return {"status": "error", "message": "Daemon closed connection (possibly crashed). Try: bb stop && bb start"}
+            
+            return response
+            
+        except socket.timeout:
+            _close_connection()
+            return {"status": "error", "message": "Request timed out (API may be slow or rate limited)"}
+        except ConnectionRefusedError:
+            _close_connection()
+            return {"status": "error", "message": "Could not connect to daemon"}
+        except BrokenPipeError:
+            _close_connection()
+            return {"status": "error", "message": "Connection broken (daemon may have crashed). Try restarting: bb stop && bb start"}
+        except KeyboardInterrupt:
+            # The rest of the response is still in flight, so the connection can't be reused
+            _close_connection()
+            raise
+        except Exception as e:
+            _close_connection()
+            return {"status": "error", "message": f"Communication error: {str(e)}"}
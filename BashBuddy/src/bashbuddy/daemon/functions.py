@@ -1,10 +1,29 @@
 """Function declarations and execution for Gemini function calling."""
 
 import os
+import json
 import shutil
+import logging
+import threading
 import subprocess
+from collections import OrderedDict
 from google.genai import types
 
+logger = logging.getLogger(__name__)
+
+# Man pages kept by get_man_page; the least recently used are evicted
+MAX_MAN_CACHE_ENTRIES = 256
+
+# (command, section) -> get_man_page result for pages that were found.
+# Installed man pages practically never change, so they are also kept
+# across daemon restarts.
+_man_cache: OrderedDict[tuple[str, str], dict] = OrderedDict()
+_man_cache_lock = threading.Lock()
+
+# (command, PATH) -> location of commands check_command_exists has found.
+# Misses aren't kept, so a command installed meanwhile is still found.
+_which_cache: dict[tuple[str, str], str] = {}
+
 
 def create_function_declarations():
     """Create all function declarations for Gemini."""
@@ -91,6 +110,121 @@ def create_function_declarations():
     ])
 
 
+def get_man_page(command: str, section: str = "") -> dict:
+    """Return the (truncated) manual page for a command, cached per (command, section)."""
+    key = (command, section)
+    with _man_cache_lock:
+        cached = _man_cache.get(key)
+        if cached is not None:
+            _man_cache.move_to_end(key)
+            return cached
+    
+    result, cacheable = _read_man_page(command, section)
+    if cacheable:
+        with _man_cache_lock:
+            _man_cache[key] = result
+            if len(_man_cache) > MAX_MAN_CACHE_ENTRIES:
+                _man_cache.popitem(last=False)
+    return result
+
+
+def _read_man_page(command: str, section: str) -> tuple[dict, bool]:
+    """
+    Run man for a command and build the get_man_page result.
+    Returns (result, cacheable): only pages that were found are cacheable,
+    since a missing page may be installed later.
+    """
+    try:
+        # Build the man command
+        if section:
+            man_cmd = ["man", section, command]
+        else:
+            man_cmd = ["man", command]
+        
+        # Run man command and capture output
+        result = subprocess.run(
+            man_cmd,
+            capture_output=True,
+            text=True,
+            timeout=5  # 5 second timeout
+        )
+        
+        if result.returncode == 0:
+            # Man page found - truncate to reasonable size (first 100 lines)
+            lines = result.stdout.split('\n')
+            truncated = '\n'.join(lines[:100])
+            
+            return {
+                "found": True,
+                "command": command,
+                "content": truncated,
+                "truncated": len(lines) > 100,
+                "total_lines": len(lines)
+            }, True
+        else:
+            # Man page not found
+            return {
+                "found": False,
+                "command": command,
+                "error": result.stderr.strip() or f"No manual entry for {command}"
+            }, False
+    
+    except subprocess.TimeoutExpired:
+        return {
+            "found": False,
+            "command": command,
+            "error": "Command timed out"
+        }, False
+    except Exception as e:
+        return {
+            "found": False,
+            "command": command,
+            "error": str(e)
+        }, False
+
+
+def _which(command: str):
+    """shutil.which, remembering commands that were found for the current PATH."""
+    key = (command, os.environ.get("PATH", ""))
+    location = _which_cache.get(key)
+    if location is None:
+        # shutil.which() returns path to command or None
+        location = shutil.which(command)
+        if location is not None:
+            _which_cache[key] = location
+    return location
+
+
+def load_man_cache(path) -> None:
+    """Fill the man page cache from a file written by save_man_cache."""
+    try:
+        with open(path, "rb") as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load man page cache: {e}")
+        return
+    
+    with _man_cache_lock:
+        for command, section, result in entries[-MAX_MAN_CACHE_ENTRIES:]:
+            _man_cache[(command, section)] = result
+
+
+def save_man_cache(path) -> None:
+    """Write the man page cache to a file (atomically)."""
+    with _man_cache_lock:
+        data = json.dumps([[command, section, result] for (command, section), result in _man_cache.items()])
+    
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save man page cache: {e}")
+
+
 def execute_function(function_name: str, arguments: dict):
     """
     Execute a function that Gemini requested.
@@ -107,13 +241,22 @@ def execute_function(function_name: str, arguments: dict):
         # Get the path argument (defaults to current directory)
         path = arguments.get("path", ".")
         try:
-            # List files and return first 20 (to avoid huge responses)
-            files = os.listdir(path)
-            return {
-                "result": files[:20],  # Limit to 20 files
-                "count": len(files),   # Total count
-                "truncated": len(files) > 20  # Was it truncated?
-            }
+            # List files and return first 20 (to avoid huge responses).
+            # Reading stops there, so huge directories aren't read in full;
+            # the total count is only known when nothing was cut off.
+            files = []
+            truncated = False
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if len(files) == 20:
+                        truncated = True
+                        break
+                    files.append(entry.name)
+            
+            response = {"result": files, "truncated": truncated}
+            if not truncated:
+                response["count"] = len(files)
+            return response
         except Exception as e:
             # If path doesn't exist or permission denied
             return {"error": str(e)}
@@ -121,8 +264,7 @@ def execute_function(function_name: str, arguments: dict):
     elif function_name == "check_command_exists":
         # Check if a command is in the system PATH
         command = arguments.get("command")
-        # shutil.which() returns path to command or None
-        exists = shutil.which(command) is not None
+        exists = _which(command) is not None
         return {
             "exists": exists,
             "command": command
@@ -132,54 +274,7 @@ def execute_function(function_name: str, arguments: dict):
         # Get the manual page for a command
         command = arguments.get("command")
         section = arguments.get("section", "")  # Optional section number
-        
-        try:
-            # Build the man command
-            if section:
-                man_cmd = ["man", section, command]
-            else:
-                man_cmd = ["man", command]
-            
-            # Run man command and capture output
-            result = subprocess.run(
-                man_cmd,
-                capture_output=True,
-                text=True,
-                timeout=5  # 5 second timeout
-            )
-            
-            if result.returncode == 0:
-                # Man page found - truncate to reasonable size (first 100 lines)
-                lines = result.stdout.split('\n')
-                truncated = '\n'.join(lines[:100])
-                
-                return {
-                    "found": True,
-                    "command": command,
-                    "content": truncated,
-                    "truncated": len(lines) > 100,
-                    "total_lines": len(lines)
-                }
-            else:
-                # Man page not found
-                return {
-                    "found": False,
-                    "command": command,
-                    "error": result.stderr.strip() or f"No manual entry for {command}"
-                }
-        
-        except subprocess.TimeoutExpired:
-            return {
-                "found": False,
-                "command": command,
-                "error": "Command timed out"
-            }
-        except Exception as e:
-            return {
-                "found": False,
-                "command": command,
-                "error": str(e)
-            }
+        return get_man_page(command, section)
     
     elif function_name == "suggested_command":
         # Gemini is providing the final command suggestion
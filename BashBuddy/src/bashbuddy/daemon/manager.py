@@ -3,6 +3,7 @@
 import os
 import subprocess
 import signal
+import select
 import time
 import sys
 from bashbuddy.daemon.client import get_pid_file, is_daemon_running, send_command, get_socket_path
@@ -35,23 +36,11 @@ def start_daemon():
             
         # Wait for daemon to initialize and become responsive
         # The daemon needs time to: load env, create socket, init Gemini client
-        max_retries = 10
-        retry_delay = 0.3
-        
-        for attempt in range(max_retries):
-            time.sleep(retry_delay)
-            
-            # Check if process is still running
-            if not is_daemon_running():
-                break
-            
-            # Try to connect
-            response = send_command("ping")
-            if response.get("status") == "ok":
-                return {"status": "ok", "message": "Daemon started successfully", "pid": process.pid}
+        if _wait_for_daemon(process):
+            return {"status": "ok", "message": "Daemon started successfully", "pid": process.pid}
         
         # If we got here, daemon didn't become responsive in time
-        if is_daemon_running():
+        if process.poll() is None:
             return {"status": "error", "message": "Daemon started but not responding (timeout)"}
         else:
             # Get error output
@@ -66,6 +55,53 @@ def start_daemon():
         return {"status": "error", "message": f"Failed to start daemon: {str(e)}"}
 
 
+def _wait_for_daemon(process, timeout: float = 3.0) -> bool:
+    """
+    Wait until a freshly started daemon answers a ping.
+    Returns False if the process exits or the timeout expires first.
+
+    Pings back off exponentially from 50ms. Where available, the waits
+    between pings block on a pidfd so a daemon that dies during startup
+    is noticed immediately instead of after the next sleep.
+    """
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        # Not Linux >= 5.3 - fall back to sleeping between pings
+        pidfd = None
+    
+    poller = None
+    if pidfd is not None:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+    
+    deadline = time.monotonic() + timeout
+    delay_ms = 50
+    try:
+        while True:
+            if send_command("ping").get("status") == "ok":
+                return True
+            
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if remaining_ms <= 0:
+                return False
+            wait_ms = min(delay_ms, remaining_ms)
+            
+            if poller is not None:
+                if poller.poll(wait_ms):
+                    # pidfd became readable: the daemon exited
+                    return False
+            else:
+                if process.poll() is not None:
+                    return False
+                time.sleep(wait_ms / 1000)
+            
+            delay_ms = min(500, delay_ms * 2)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
 def stop_daemon():
     """Stop the daemon process."""
     if not is_daemon_running():
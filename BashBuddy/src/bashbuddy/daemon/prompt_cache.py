@@ -0,0 +1,115 @@
+"""Daemon-side cache of Gemini answers, keyed on the full prompt and kept across restarts."""
+
+import os
+import json
+import logging
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+from bashbuddy.core.config import get_runtime_dir, SYSTEM_INSTRUCTION, GEMINI_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Least recently used answers beyond this are evicted
+MAX_ENTRIES = 512
+
+# Answers older than this (in seconds) are not served any more
+MAX_AGE = 24 * 60 * 60
+
+
+class PromptCache:
+    """
+    Exact-match cache of command answers, keyed on everything that is sent
+    to Gemini: model, system instruction and the contents (the summarized
+    and recent history, then the new message). A hit therefore means Gemini
+    would have been asked the very same thing, so the round trip (and its
+    function calls) can be skipped.
+
+    Entries live in memory and are saved to ~/.bashbuddy/prompt_cache.json
+    on shutdown, so they survive daemon restarts. They expire after MAX_AGE
+    and are all dropped when the conversation is reset.
+    """
+
+    def __init__(self):
+        self.path = get_runtime_dir() / "prompt_cache.json"
+        # key -> [time stored, answer]
+        self._entries: OrderedDict[str, List[Any]] = OrderedDict()
+        # Asks run on several worker threads
+        self._lock = threading.Lock()
+        # Prefix shared by every key, hashed once
+        self._prefix = hashlib.blake2b(
+            f"{GEMINI_MODEL}\0{SYSTEM_INSTRUCTION}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def key(self, contents: List[Any]) -> str:
+        """Cache key for sending these contents (only what Gemini sees is hashed)."""
+        digest = hashlib.blake2b(self._prefix, digest_size=16)
+        digest.update(json.dumps(contents).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached answer for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > MAX_AGE:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an answer, evicting the least recently used one if full."""
+        with self._lock:
+            self._entries[key] = [time.time(), entry]
+            self._entries.move_to_end(key)
+            if len(self._entries) > MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def load(self) -> None:
+        """Load the entries saved by a previous daemon, if any."""
+        try:
+            with open(self.path, "rb") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load prompt cache: {e}")
+            return
+
+        # (entries saved before they had a timestamp count as expired)
+        cutoff = time.time() - MAX_AGE
+        fresh = [
+            (key, entry) for key, entry in entries.items()
+            if isinstance(entry, list) and entry[0] >= cutoff
+        ]
+        with self._lock:
+            self._entries = OrderedDict(fresh[-MAX_ENTRIES:])
+        logger.info(f"Loaded {len(self._entries)} cached answers")
+
+    def clear(self) -> None:
+        """Forget every answer, including the saved ones."""
+        with self._lock:
+            self._entries.clear()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove prompt cache: {e}")
+
+    def save(self) -> None:
+        """Write the entries to disk (atomically, so a crash can't corrupt the file)."""
+        with self._lock:
+            data = json.dumps(self._entries)
+
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save prompt cache: {e}")
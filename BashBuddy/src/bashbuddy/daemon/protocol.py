@@ -0,0 +1,108 @@
+"""Wire format shared by the daemon and its clients.
+
+Every message is one frame: a protocol version byte, the body length as a
+4-byte big-endian integer, then the body as UTF-8 JSON.
+"""
+
+import json
+import struct
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Only the daemon reads frames asynchronously; clients import this
+    # module on every CLI invocation and shouldn't pay for asyncio
+    import asyncio
+
+try:
+    import orjson
+except ImportError:  # Optional, install bashbuddy[fast] to use it
+    orjson = None
+
+
+PROTOCOL_VERSION = 1
+
+_HEADER = struct.Struct(">BI")
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a frame we can't understand."""
+
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(message: dict) -> bytes:
+        return json.dumps(message).encode("utf-8")
+
+    _loads = json.loads
+
+
+def encode_frame(message: dict) -> bytes:
+    """Serialize a message into a complete frame."""
+    body = _dumps(message)
+    return _HEADER.pack(PROTOCOL_VERSION, len(body)) + body
+
+
+def _recv_exact(sock, size: int):
+    """
+    Read exactly size bytes from sock.
+    Returns None if the peer closed the connection before sending anything.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            if received == 0:
+                return None
+            raise ConnectionResetError("Connection closed in the middle of a frame")
+        received += count
+    return buffer
+
+
+def read_frame(sock):
+    """
+    Read one frame from sock and return the decoded message.
+    Returns None if the peer closed the connection cleanly.
+    """
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+
+    length = _body_length(header)
+    body = _recv_exact(sock, length) if length else bytearray()
+    if body is None:
+        raise ConnectionResetError("Connection closed in the middle of a frame")
+    return _loads(body)
+
+
+async def read_frame_async(reader: "asyncio.StreamReader"):
+    """
+    Read one frame from an asyncio stream and return the decoded message.
+    Returns None if the peer closed the connection cleanly.
+    """
+    import asyncio
+
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise ConnectionResetError("Connection closed in the middle of a frame") from e
+
+    length = _body_length(header)
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionResetError("Connection closed in the middle of a frame") from e
+    return _loads(body)
+
+
+def _body_length(header) -> int:
+    """Check a frame header and return the length of the body that follows."""
+    version, length = _HEADER.unpack(header)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version: {version}")
+    return length
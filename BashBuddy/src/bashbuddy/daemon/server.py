@@ -1,20 +1,41 @@
 """Main daemon server - refactored version."""
 
 import os
-import json
-import socket
+import asyncio
 import threading
 import signal
-import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
 
-from bashbuddy.core.config import setup_logging, load_api_key, SYSTEM_INSTRUCTION
-from bashbuddy.daemon.functions import create_function_declarations, execute_function
+from bashbuddy.core.config import (
+    setup_logging, flush_logging, load_api_key, get_runtime_dir, SYSTEM_INSTRUCTION, GEMINI_MODEL
+)
+from bashbuddy.core.history import parse_command_entry
+from bashbuddy.daemon.functions import (
+    create_function_declarations, execute_function, load_man_cache, save_man_cache
+)
+from bashbuddy.daemon.prompt_cache import PromptCache
+from bashbuddy.daemon.session import SessionLog
+from bashbuddy.daemon.protocol import encode_frame, read_frame_async
 
 
 logger = setup_logging()
 
+# Asks processed at once; further asks wait until a worker thread is free
+MAX_WORKERS = 16
+
+# Messages kept in the conversation history; the oldest are dropped first
+MAX_HISTORY = 200
+
+# Question/answer turns sent to Gemini verbatim; older ones are summarized
+MAX_CONTEXT_TURNS = 6
+
+# Seconds running asks get to finish on shutdown (stop_daemon kills after 2)
+SHUTDOWN_GRACE = 1.5
+
 
 class BashBuddyDaemon:
     """Daemon that maintains Gemini client and conversation history."""
@@ -22,15 +43,37 @@ class BashBuddyDaemon:
     def __init__(self, socket_path: str):
         self.socket_path = socket_path
         self.client = None
-        self.history = []
+        self.history = deque(maxlen=MAX_HISTORY)
+        self.history_mtime = time.time()
+        # Asks run on several worker threads, and iterating a deque while
+        # another thread appends to it raises, so every access holds this
+        self.history_lock = threading.RLock()
         self.running = False
-        self.server_socket = None
+        self.server = None
+        self.stopped = None
+        # Asks block on Gemini and run here, off the event loop
+        self.pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="bashbuddy")
+        # Function calls run here, separate from the asks waiting on them
+        self.tool_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="bashbuddy-tool")
+        # Writers of open client connections, closed on shutdown
+        self.connections = set()
+        # Asks running on the pool, waited for (briefly) on shutdown
+        self.pending_asks = set()
+        self.prompt_cache = PromptCache()
+        self.session = SessionLog()
         
         # Create function declarations
         self.tool = create_function_declarations()
 
+        # Same for every request, so it is built (and validated) only once
+        self.generation_config = types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            tools=[self.tool],
+            thinking_config=types.ThinkingConfig(thinking_budget=0),
+        )
+
     def start(self):
-        """Start the daemon server."""
+        """Start the daemon server and serve until it is shut down."""
         # Load API key
         api_key = load_api_key(logger)
 
@@ -38,92 +81,156 @@ class BashBuddyDaemon:
         self.client = genai.Client(api_key=api_key)
         logger.info("Gemini client initialized")
 
-        self.generation_config = types.GenerateContentConfig(
-            thinking_config=types.ThinkingConfig(thinking_budget=0),
-            system_instruction=SYSTEM_INSTRUCTION,
-        )
+        # Open the HTTPS connection to Gemini now rather than on the first ask
+        threading.Thread(target=self._warm_up_client, daemon=True).start()
+
+        self.prompt_cache.load()
+        # Continue the conversation from before the last shutdown (or crash)
+        self.history.extend(self.session.load(MAX_HISTORY))
+        if self.history:
+            logger.info(f"Restored {len(self.history)} history messages")
+        load_man_cache(get_runtime_dir() / "man_cache.json")
 
         # Remove old socket if it exists
         if os.path.exists(self.socket_path):
             os.remove(self.socket_path)
 
-        # Create Unix socket
-        self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        self.server_socket.bind(self.socket_path)
-        self.server_socket.listen(5)
+        if not asyncio.run(self._serve()):
+            # State is saved; don't let interpreter exit join the stuck asks
+            os._exit(0)
+
+    async def _serve(self):
+        """
+        Accept connections on the Unix socket until shutdown is requested.
+        Returns False if some asks were still running when it gave up on them.
+        """
+        loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+
+        self.server = await asyncio.start_unix_server(
+            self._handle_request, path=self.socket_path, backlog=5
+        )
 
         # Set up signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self._handle_shutdown)
-        signal.signal(signal.SIGTERM, self._handle_shutdown)
+        loop.add_signal_handler(signal.SIGINT, self._handle_shutdown)
+        loop.add_signal_handler(signal.SIGTERM, self._handle_shutdown)
 
         self.running = True
         logger.info(f"✓ BashBuddy daemon started (socket: {self.socket_path})")
         logger.info("Press Ctrl+C to stop")
 
-        # Accept connections
-        while self.running:
-            try:
-                client_socket, _ = self.server_socket.accept()
-                # Handle each request in a separate thread
-                thread = threading.Thread(
-                    target=self._handle_request, args=(client_socket,), daemon=True
-                )
-                thread.start()
-            except Exception as e:
-                if self.running:
-                    logger.error(f"Error accepting connection: {e}")
-
-    def _handle_request(self, client_socket):
-        """Handle a single client request."""
+        await self.stopped.wait()
+
+        self.server.close()
+        # Drop queued asks and give running ones a bounded time to finish,
+        # so their answers still reach the history and caches saved below
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        unfinished = set()
+        if self.pending_asks:
+            _, unfinished = await asyncio.wait(self.pending_asks, timeout=SHUTDOWN_GRACE)
+            if unfinished:
+                logger.warning(f"Abandoning {len(unfinished)} unfinished ask(s)")
+        self.tool_pool.shutdown(wait=False, cancel_futures=True)
+        for writer in self.connections:
+            writer.close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.prompt_cache.save()
+        self.session.close()
+        save_man_cache(get_runtime_dir() / "man_cache.json")
+        flush_logging()
+        return not unfinished
+
+    def _warm_up_client(self):
+        """Make a cheap API call so the client's keep-alive connection is ready."""
+        try:
+            self.client.models.get(model=GEMINI_MODEL)
+            logger.info("Gemini connection warmed up")
+        except Exception as e:
+            logger.warning(f"Could not warm up Gemini connection: {e}")
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle client requests until the client closes the connection.
+
+        Requests and responses are length-prefixed frames (see
+        daemon.protocol), so one connection can carry several round trips.
+        A streaming ask may be answered with any number of
+        {"status": "progress", ...} frames before its final response.
+        Asks run on the worker pool; everything else is answered inline.
+        """
+        loop = asyncio.get_running_loop()
+
+        def send_frame(frame: dict):
+            # Called from the worker thread running the ask
+            loop.call_soon_threadsafe(writer.write, encode_frame(frame))
+
+        self.connections.add(writer)
         try:
-            # Receive data
-            data = b""
             while True:
-                chunk = client_socket.recv(4096)
-                if not chunk:
-                    break
-                data += chunk
-                if b"\n\n" in data:  # End marker
-                    break
-
-            if not data:
-                return
-
-            # Parse request
-            request = json.loads(data.decode("utf-8").strip())
-            command = request.get("command")
-
-            if command == "ask":
-                message = request.get("message")
-                force_fresh = request.get("force_fresh", False)
-                response = self._handle_ask(message, force_fresh=force_fresh)
-            elif command == "ping":
-                response = {"status": "ok", "message": "pong"}
-            elif command == "reset":
-                response = self._handle_reset()
-            elif command == "history":
-                response = self._handle_history()
-            elif command == "status":
-                response = {"status": "ok", "message": "Daemon is running"}
-            else:
-                response = {"status": "error", "message": f"Unknown command: {command}"}
-
-            # Send response
-            response_data = json.dumps(response).encode("utf-8") + b"\n\n"
-            client_socket.sendall(response_data)
+                # Receive the next request
+                request = await read_frame_async(reader)
+                if request is None:
+                    return
+
+                if request.get("command") == "ask":
+                    ask = loop.run_in_executor(self.pool, self._dispatch, request, send_frame)
+                    self.pending_asks.add(ask)
+                    ask.add_done_callback(self.pending_asks.discard)
+                    response = await ask
+                else:
+                    response = self._dispatch(request)
+
+                # Send response
+                writer.write(encode_frame(response))
+                await writer.drain()
 
         except Exception as e:
             logger.error(f"Error handling request: {e}", exc_info=True)
             error_response = {"status": "error", "message": f"Failed to generate response: {str(e)}"}
             try:
-                client_socket.sendall(json.dumps(error_response).encode("utf-8") + b"\n\n")
+                writer.write(encode_frame(error_response))
+                await writer.drain()
             except:
                 pass
         finally:
-            client_socket.close()
+            self.connections.discard(writer)
+            writer.close()
+
+    def _dispatch(self, request: dict, send_frame=None):
+        """Route a parsed request to its handler and return the response."""
+        command = request.get("command")
+
+        if command == "ask":
+            message = request.get("message")
+            force_fresh = request.get("force_fresh", False)
+
+            def send_progress(call):
+                send_frame({"status": "progress", "function_call": call})
+
+            return self._handle_ask(
+                message, force_fresh=force_fresh,
+                on_function_call=send_progress if request.get("stream") and send_frame else None
+            )
+        elif command == "ping":
+            return {"status": "ok", "message": "pong"}
+        elif command == "reset":
+            return self._handle_reset()
+        elif command == "history":
+            return self._handle_history(request.get("limit"))
+        elif command == "history_version":
+            return self._handle_history_version()
+        elif command == "status":
+            return {"status": "ok", "message": "Daemon is running"}
+        else:
+            return {"status": "error", "message": f"Unknown command: {command}"}
+
+    def _handle_ask(self, message: str, force_fresh: bool = False, on_function_call=None):
+        """
+        Process a question using Gemini with function calling.
 
-    def _handle_ask(self, message: str, force_fresh: bool = False):
-        """Process a question using Gemini with function calling."""
+        If given, on_function_call is called with each function call as soon
+        as Gemini makes it, so progress can be streamed to the client.
+        """
         try:
             # Check if we have an exact match in history (unless force_fresh)
             if not force_fresh:
@@ -132,68 +239,93 @@ class BashBuddyDaemon:
                     logger.info(f"Cache hit for query: {message[:50]}...")
                     return cached_result
             
+            # Build conversation contents from the recent history and the new
+            # question, with older turns folded into a summary
+            history = self._history_snapshot()
+            contents = self._build_contents(history, message)
+            
+            # Same prompt as an earlier ask (possibly before a restart)? (unless force_fresh)
+            cache_key = self.prompt_cache.key(contents)
+            if not force_fresh:
+                cached_answer = self.prompt_cache.get(cache_key)
+                if cached_answer:
+                    logger.info(f"Prompt cache hit for query: {message[:50]}...")
+                    with self.history_lock:
+                        self._append_history("user", message)
+                        self._append_history(
+                            "assistant",
+                            f"Command: {cached_answer['command']}\nExplanation: {cached_answer['explanation']}"
+                        )
+                    return {
+                        "status": "ok",
+                        **cached_answer,
+                        "cached": True,
+                        "history_length": len(self.history)
+                    }
+            
             # Add user message to history
-            self.history.append({"role": "user", "content": message})
+            self._append_history("user", message)
 
             function_history = []
             
-            # Build conversation contents from history
-            contents = []
-            for msg in self.history:
-                if msg["role"] == "user":
-                    contents.append(msg["content"])
-                elif msg["role"] == "assistant":
-                    contents.append({
-                        "role": "model",
-                        "parts": [{"text": msg["content"]}]
-                    })
-            
-            logger.debug(f"Conversation history length: {len(self.history)} messages")
+            logger.debug(f"Conversation history length: {len(history) + 1} messages")
             logger.debug(f"Sending {len(contents)} content items to Gemini")
 
             # Function calling loop
             max_iterations = 10
             retry_count = 0  # Track if we've retried for text response
             for iteration in range(max_iterations):
-                # Call Gemini with tools enabled
-                response = self.client.models.generate_content(
-                    model="gemini-2.0-flash",
+                # Call Gemini with tools enabled, streaming the response
+                func_call = None
+                pending_result = None
+                text_parts = []
+                for chunk in self.client.models.generate_content_stream(
+                    model=GEMINI_MODEL,
                     contents=contents,
-                    config=types.GenerateContentConfig(
-                        system_instruction=SYSTEM_INSTRUCTION,
-                        tools=[self.tool],
-                        thinking_config=types.ThinkingConfig(thinking_budget=0)
-                    ),
-                )
-
-                # Extract response
-                candidate = response.candidates[0]
-                part = candidate.content.parts[0]
+                    config=self.generation_config,
+                ):
+                    if not chunk.candidates or not chunk.candidates[0].content:
+                        continue
+                    for part in chunk.candidates[0].content.parts or []:
+                        if part.function_call and func_call is None:
+                            func_call = part.function_call
+                            func_name = func_call.name
+                            func_args = dict(func_call.args or {})
+                            
+                            logger.debug(f"[Iteration {iteration+1}] Calling: {func_name}({func_args})")
+                            
+                            # Store function call
+                            function_history.append({
+                                "name": func_name,
+                                "args": func_args
+                            })
+                            if on_function_call:
+                                on_function_call(function_history[-1])
+                            
+                            # Start executing it while the rest of the response streams in
+                            pending_result = self.tool_pool.submit(execute_function, func_name, func_args)
+                        elif part.text:
+                            text_parts.append(part.text)
 
                 # Check if Gemini called a function
-                if hasattr(part, 'function_call') and part.function_call:
-                    func_call = part.function_call
-                    func_name = func_call.name
-                    func_args = dict(func_call.args)
-                    
-                    logger.debug(f"[Iteration {iteration+1}] Calling: {func_name}({func_args})")
-                    
-                    # Store function call
-                    function_history.append({
-                        "name": func_name,
-                        "args": func_args
-                    })
-
-                    # Execute the function
-                    result = execute_function(func_name, func_args)
+                if func_call is not None:
+                    result = pending_result.result()
                     logger.debug(f"[Iteration {iteration+1}] Result: {result}")
 
                     # Check if this is the final answer
                     if result.get("is_final_answer"):
-                        self.history.append({
-                            "role": "assistant",
-                            "content": f"Command: {result['command']}\nExplanation: {result['explanation']}"
-                        })
+                        self._append_history(
+                            "assistant",
+                            f"Command: {result['command']}\nExplanation: {result['explanation']}"
+                        )
+                        # Answers that looked at the environment (files,
+                        # installed commands, ...) may not hold later
+                        if len(function_history) == 1:
+                            self.prompt_cache.put(cache_key, {
+                                "command": result["command"],
+                                "explanation": result["explanation"],
+                                "function_calls": function_history
+                            })
                         
                         return {
                             "status": "ok",
@@ -223,7 +355,7 @@ class BashBuddyDaemon:
 
                 else:
                     # Gemini returned text instead of function call
-                    answer = part.text
+                    answer = "".join(text_parts)
                     
                     logger.warning(f"[Iteration {iteration+1}] Gemini returned text instead of function call: {answer[:100]}...")
                     
@@ -254,7 +386,7 @@ class BashBuddyDaemon:
                     # Already retried once, accept the text response
                     logger.info("Already retried once, accepting text response")
                     
-                    self.history.append({"role": "assistant", "content": answer})
+                    self._append_history("assistant", answer)
                     
                     return {
                         "status": "ok",
@@ -275,7 +407,7 @@ class BashBuddyDaemon:
                         last_text = parts[0]["text"]
                         break
             
-            self.history.append({"role": "assistant", "content": last_text})
+            self._append_history("assistant", last_text)
             return {
                 "status": "ok",
                 "message": f"[Warning: Exceeded function call limit after {len(function_history)} function calls]\n\n{last_text}",
@@ -295,56 +427,142 @@ class BashBuddyDaemon:
         Check if we have an exact match for this query in history.
         Returns the cached response if found, None otherwise.
         """
-        # Look for matching user query in history
-        for i in range(len(self.history) - 1):
-            if self.history[i]["role"] == "user" and self.history[i]["content"].strip().lower() == query.strip().lower():
-                # Found a match! Get the next assistant response
-                if i + 1 < len(self.history) and self.history[i + 1]["role"] == "assistant":
-                    cached_response = self.history[i + 1]["content"]
-                    
-                    # Parse the cached response to extract command and explanation
-                    if "Command:" in cached_response and "Explanation:" in cached_response:
-                        lines = cached_response.split("\n")
-                        command = ""
-                        explanation = ""
-                        
-                        for line in lines:
-                            if line.startswith("Command:"):
-                                command = line.replace("Command:", "").strip()
-                            elif line.startswith("Explanation:"):
-                                explanation = line.replace("Explanation:", "").strip()
-                        
-                        if command:
-                            return {
-                                "status": "ok",
-                                "type": "command",
-                                "command": command,
-                                "explanation": explanation,
-                                "cached": True,
-                                "history_length": len(self.history)
-                            }
+        query = query.strip().lower()
+        
+        # Look for matching user query in history (walked pairwise)
+        history = self._history_snapshot()
+        previous = None
+        for msg in history:
+            if (previous is not None and previous["role"] == "user" and msg["role"] == "assistant"
+                    and previous["content"].strip().lower() == query):
+                # Found a match! Parse the assistant response to extract command and explanation
+                parsed = parse_command_entry(msg["content"])
+                if parsed and parsed[0]:
+                    command, explanation = parsed
+                    return {
+                        "status": "ok",
+                        "type": "command",
+                        "command": command,
+                        "explanation": explanation,
+                        "cached": True,
+                        "history_length": len(history)
+                    }
+            previous = msg
         
         return None
 
+    def _history_snapshot(self) -> list:
+        """Return a copy of the history that is safe to iterate."""
+        with self.history_lock:
+            return list(self.history)
+
+    def _append_history(self, role: str, content: str):
+        """Append a message to history and bump its modification time."""
+        message = {"role": role, "content": content}
+        with self.history_lock:
+            self.history.append(message)
+            self.session.append(message)
+            self.history_mtime = time.time()
+
     def _handle_reset(self):
         """Reset conversation history."""
-        self.history = []
+        with self.history_lock:
+            self.history.clear()
+            self.session.clear()
+            self.history_mtime = time.time()
+        # Let a reset also get rid of a bad cached answer
+        self.prompt_cache.clear()
         return {"status": "ok", "message": "✓ Conversation history cleared"}
 
-    def _handle_history(self):
-        """Return conversation history."""
+    def _handle_history(self, limit: int = None):
+        """
+        Return conversation history.
+
+        With a limit only the last `limit` messages are sent, along with a
+        short summary of the commands suggested in the omitted ones.
+        """
+        if limit is not None and (type(limit) is not int or limit < 0):
+            return {"status": "error", "message": f"Invalid limit: {limit!r}"}
+
+        history = self._history_snapshot()
+        total = len(history)
+        omitted = []
+        if limit is not None and total > limit:
+            split = total - limit
+            omitted = history[:split]
+            items = history[split:]
+        else:
+            items = history
+
+        response = {
+            "status": "ok",
+            "history": items,
+            "count": total
+        }
+        if omitted:
+            response["omitted"] = len(omitted)
+            response["summary"] = self._summarize_history(omitted)
+        return response
+
+    def _build_contents(self, history: list, message: str) -> list:
+        """
+        Gemini contents for asking message after history: the last
+        MAX_CONTEXT_TURNS turns verbatim, preceded by a summary of older ones.
+        """
+        recent_start = max(0, len(history) - 2 * MAX_CONTEXT_TURNS)
+        contents = []
+        if recent_start:
+            contents.append(self._context_summary(history[:recent_start]))
+        for msg in history[recent_start:]:
+            if msg["role"] == "user":
+                contents.append(msg["content"])
+            elif msg["role"] == "assistant" and contents:
+                # (an answer whose question was trimmed from history is skipped)
+                contents.append({
+                    "role": "model",
+                    "parts": [{"text": msg["content"]}]
+                })
+        contents.append(message)
+        return contents
+
+    def _context_summary(self, items):
+        """Summarize older messages in one short user message for Gemini."""
+        turns = []
+        question = None
+        for item in items:
+            if item["role"] == "user":
+                question = item["content"]
+            elif question is not None:
+                parsed = parse_command_entry(item["content"])
+                answer = f"`{parsed[0]}`" if parsed and parsed[0] else "a text answer"
+                turns.append(f"'{question[:80]}' -> {answer}")
+                question = None
+
+        return "[Prior context: earlier in this conversation the user asked " + "; ".join(turns) + "]"
+
+    def _summarize_history(self, items: list):
+        """Summarize messages as the list of commands that were suggested in them."""
+        commands = []
+        for item in items:
+            if item["role"] == "assistant":
+                parsed = parse_command_entry(item["content"])
+                if parsed and parsed[0]:
+                    commands.append(parsed[0])
+
+        if not commands:
+            return f"{len(items)} earlier messages, no commands"
+        return f"{len(items)} earlier messages, commands: " + "; ".join(commands)
+
+    def _handle_history_version(self):
+        """Return a cheap version stamp of the history (length, last change)."""
         return {
             "status": "ok",
-            "history": self.history,
-            "count": len(self.history)
+            "length": len(self.history),
+            "mtime": self.history_mtime
         }
 
-    def _handle_shutdown(self, signum, frame):
+    def _handle_shutdown(self):
         """Handle graceful shutdown."""
         logger.info("Shutting down daemon...")
         self.running = False
-        if self.server_socket:
-            self.server_socket.close()
-        if os.path.exists(self.socket_path):
-            os.remove(self.socket_path)
-        sys.exit(0)
+        self.stopped.set()
@@ -0,0 +1,98 @@
+"""On-disk copy of the daemon's conversation history, so it survives restarts."""
+
+import os
+import json
+import fcntl
+import logging
+import threading
+from collections import deque
+from typing import Dict, List
+from bashbuddy.core.config import get_runtime_dir
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLog:
+    """
+    Append-only JSON lines file of history messages (~/.bashbuddy/session.jsonl).
+
+    Each message is appended as one line when it is added to the history,
+    so a crash loses at most the message being written. On load the file
+    is compacted to the messages that are still kept.
+    """
+
+    def __init__(self):
+        self.path = get_runtime_dir() / "session.jsonl"
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self, max_messages: int) -> List[Dict[str, str]]:
+        """Return the last max_messages saved messages and open the log for appending."""
+        messages = deque(maxlen=max_messages)
+        line_count = 0
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    line_count += 1
+                    try:
+                        messages.append(json.loads(line))
+                    except ValueError:
+                        # Partially written line from a crash
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not load session history: {e}")
+
+        if line_count > len(messages):
+            self._rewrite(messages)
+
+        try:
+            self._file = open(self.path, "a")
+        except OSError as e:
+            logger.warning(f"Session history won't be saved: {e}")
+        return list(messages)
+
+    def append(self, message: Dict[str, str]) -> None:
+        """Append one message to the log."""
+        if self._file is None:
+            return
+        line = json.dumps(message) + "\n"
+        with self._lock:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+                try:
+                    self._file.write(line)
+                    self._file.flush()
+                finally:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+            except OSError as e:
+                logger.warning(f"Could not save history message: {e}")
+
+    def clear(self) -> None:
+        """Forget every saved message."""
+        if self._file is None:
+            return
+        with self._lock:
+            try:
+                self._file.truncate(0)
+            except OSError as e:
+                logger.warning(f"Could not clear session history: {e}")
+
+    def _rewrite(self, messages) -> None:
+        """Replace the log with the given messages (atomically)."""
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                f.writelines(json.dumps(message) + "\n" for message in messages)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not compact session history: {e}")
+
+    def close(self) -> None:
+        """Close the log file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+